@@ -0,0 +1,290 @@
+"""
+In-process stand-ins for voctoweb and transcribee, served through an
+`httpx.MockTransport`, so the pipeline can be measured without the network.
+
+Both fakes answer with the payloads the real apis send (as far as the clients
+parse them), add a configurable latency to every request and count requests per
+route.
+"""
+
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import hashlib
+import json
+import random
+import re
+import uuid
+
+import httpx
+
+from benchmarks.transcripts import generate_vtt
+
+VOC_URL = "http://voctoweb.fake/api/conferences"
+CDN_URL = "http://cdn.fake"
+TRANSCRIBEE_URL = "http://transcribee.fake"
+
+
+def _json(data, status_code=200, headers=None) -> httpx.Response:
+    return httpx.Response(status_code, content=json.dumps(data).encode(), headers={
+        "content-type": "application/json",
+        **(headers or {}),
+    })
+
+
+class FakeVoctoweb:
+    def __init__(
+        self,
+        conference: str,
+        n_events: int,
+        recording_size: int = 16 * 1024,
+        description_size: int = 2000,
+        validators: bool = True,
+        seed: int = 0,
+    ):
+        self.conference = conference
+        self.recording_size = recording_size
+        self.description_size = description_size
+        # whether the conference listing is sent with an ETag
+        self.validators = validators
+        self.uploads = 0
+        self._rng = random.Random(seed)
+        self._recording = bytes(recording_size)
+        self.events: list[dict] = []
+        self._by_guid: dict[str, dict] = {}
+        for _ in range(n_events):
+            self.add_event()
+
+    def add_event(self):
+        i = len(self.events)
+        guid = str(uuid.UUID(int=self._rng.getrandbits(128)))
+        date = datetime(2023, 12, 27, 10) + timedelta(minutes=40 * i)
+        event = {
+            "guid": guid,
+            "slug": f"{self.conference}-{i}-talk",
+            "title": f"Talk number {i}",
+            "date": date.isoformat(),
+            "video": {"filename": f"{self.conference}-{i}-eng-talk.mp4"},
+        }
+        self.events.append(event)
+        self._by_guid[guid] = event
+        self._listing = None
+
+    def listing(self) -> bytes:
+        if self._listing is None:
+            self._listing = json.dumps({
+                "id": self.conference,
+                "title": f"Fake conference {self.conference}",
+                "events": self.events,
+            }).encode()
+        return self._listing
+
+    def details(self, guid: str) -> dict | None:
+        summary = self._by_guid.get(guid)
+        if summary is None:
+            return None
+
+        return {
+            **summary,
+            "subtitle": None,
+            "link": "https://events.ccc.de/",
+            "description": "x" * self.description_size,
+            "original_language": "eng",
+            "persons": ["Speaker"],
+            "tags": [self.conference],
+            "view_count": self._rng.randrange(10000),
+            "promoted": False,
+            "release_date": summary["date"][:10],
+            "updated_at": summary["date"],
+            "length": 2400,
+            "duration": 2400,
+            "thumb_url": f"{CDN_URL}/{guid}.jpg",
+            "poster_url": f"{CDN_URL}/{guid}_preview.jpg",
+            "timeline_url": f"{CDN_URL}/{guid}.timeline.jpg",
+            "thumbnails_url": f"{CDN_URL}/{guid}.thumbnails.vtt",
+            "frontend_link": f"https://media.ccc.de/v/{summary['slug']}",
+            "url": f"{VOC_URL}/{self.conference}/events/{guid}",
+            "related": [],
+            "recordings": [
+                {
+                    "filename": f"{guid}.mp4",
+                    "mime_type": "video/mp4",
+                    "language": "eng",
+                    "folder": "h264-sd",
+                    "size": round(self.recording_size / 1e6),
+                    "length": 2400,
+                    "state": "new",
+                    "high_quality": False,
+                    "width": 720,
+                    "height": 576,
+                    "updated_at": summary["date"],
+                    "recording_url": f"{CDN_URL}/{guid}.mp4",
+                }
+            ],
+        }
+
+    async def handle(self, request: httpx.Request, path: str) -> tuple[str, httpx.Response]:
+        if path == f"/{self.conference}" and request.method == "GET":
+            body = self.listing()
+            if not self.validators:
+                return "conference", httpx.Response(200, content=body)
+            etag = f'"{hashlib.sha256(body).hexdigest()}"'
+            if request.headers.get("if-none-match") == etag:
+                return "conference", httpx.Response(304, headers={"etag": etag})
+            return "conference", httpx.Response(200, content=body, headers={"etag": etag})
+
+        if match := re.fullmatch(rf"/{self.conference}/events/([^/]+)", path):
+            details = self.details(match[1])
+            if details is None:
+                return "event", httpx.Response(404)
+            return "event", _json(details)
+
+        if re.fullmatch(rf"/{self.conference}/events/([^/]+)/file", path) and request.method == "PUT":
+            await request.aread()
+            self.uploads += 1
+            return "upload", _json({})
+
+        return "unknown", httpx.Response(404)
+
+    async def handle_recording(self, request: httpx.Request) -> httpx.Response:
+        size = len(self._recording)
+        headers = {"accept-ranges": "bytes", "content-type": "video/mp4"}
+        if request.method == "HEAD":
+            return httpx.Response(200, headers={**headers, "content-length": str(size)})
+
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", request.headers.get("range", ""))
+        if match is None:
+            return httpx.Response(200, content=self._recording, headers=headers)
+
+        start = int(match[1])
+        end = int(match[2]) if match[2] else size - 1
+        return httpx.Response(206, content=self._recording[start : end + 1], headers={
+            **headers,
+            "content-range": f"bytes {start}-{end}/{size}",
+        })
+
+
+@dataclass
+class _FakeDocument:
+    id: str
+    name: str
+    created_at: str
+    changed_at: str
+    tasks: list[dict] = field(default_factory=list)
+
+
+class FakeTranscribee:
+    def __init__(self, vtt_seconds: float = 600, task_cost: float = 300.0, seed: int = 0):
+        self.vtt = generate_vtt(vtt_seconds, seed=seed)
+        self.task_cost = task_cost
+        self.documents: dict[str, _FakeDocument] = {}
+        self._rng = random.Random(seed)
+
+    def _uuid(self) -> str:
+        return str(uuid.UUID(int=self._rng.getrandbits(128)))
+
+    def _create_document(self) -> _FakeDocument:
+        now = datetime.now().isoformat()
+        doc = _FakeDocument(id=self._uuid(), name="video.mp4", created_at=now, changed_at=now)
+        for task_type in ("TRANSCRIBE", "ALIGN"):
+            doc.tasks.append({
+                "id": self._uuid(),
+                "document_id": doc.id,
+                "dependencies": [],
+                "state": "NEW",
+                "task_parameters": {},
+                "task_type": task_type,
+            })
+        self.documents[doc.id] = doc
+        return doc
+
+    def finish(self, fraction: float = 1.0):
+        """
+        Completes the tasks of the oldest `fraction` of the documents
+        """
+        docs = list(self.documents.values())
+        for doc in docs[: round(len(docs) * fraction)]:
+            for task in doc.tasks:
+                task["state"] = "COMPLETED"
+            doc.changed_at = datetime.now().isoformat()
+
+    def _document(self, doc: _FakeDocument) -> dict:
+        return {
+            "id": doc.id,
+            "name": doc.name,
+            "created_at": doc.created_at,
+            "changed_at": doc.changed_at,
+            "media_files": [],
+        }
+
+    async def handle(self, request: httpx.Request, path: str) -> tuple[str, httpx.Response]:
+        if path == "/api/v1/documents/":
+            if request.method == "POST":
+                await request.aread()
+                return "create_document", _json(self._document(self._create_document()))
+            return "list_documents", _json([
+                {**self._document(doc), "tasks": doc.tasks} for doc in self.documents.values()
+            ])
+
+        if path == "/api/v1/tasks/queue_info/":
+            return "queue_info", _json({
+                "open_tasks": [
+                    {**task, "remaining_cost": self.task_cost}
+                    for doc in self.documents.values()
+                    for task in doc.tasks
+                    if task["state"] != "COMPLETED"
+                ]
+            })
+
+        match = re.fullmatch(r"/api/v1/documents/([^/]+)/(tasks|share_tokens|export)/", path)
+        if match is None or match[1] not in self.documents:
+            return "unknown", httpx.Response(404)
+
+        doc = self.documents[match[1]]
+        if match[2] == "tasks":
+            return "tasks", _json(doc.tasks)
+        if match[2] == "share_tokens":
+            return "share_token", _json({
+                "can_write": True,
+                "document_id": doc.id,
+                "id": self._uuid(),
+                "name": "voctoweb-glue",
+                "token": self._uuid(),
+                "valid_until": None,
+            })
+        return "export", httpx.Response(200, text=self.vtt)
+
+
+class FakeUpstreams:
+    """
+    Routes requests to the fakes by host. Use `transport` for the `httpx.AsyncClient`.
+    """
+
+    def __init__(self, voctoweb: FakeVoctoweb, transcribee: FakeTranscribee, latency: float = 0.0):
+        self.voctoweb = voctoweb
+        self.transcribee = transcribee
+        self.latency = latency
+        self.requests: Counter[str] = Counter()
+        self.transport = httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        url = str(request.url.copy_with(query=None))
+        if url.startswith(VOC_URL):
+            route, response = await self.voctoweb.handle(request, url.removeprefix(VOC_URL))
+            upstream = "voctoweb"
+        elif url.startswith(TRANSCRIBEE_URL):
+            route, response = await self.transcribee.handle(request, url.removeprefix(TRANSCRIBEE_URL))
+            upstream = "transcribee"
+        else:
+            route, response = "recording", await self.voctoweb.handle_recording(request)
+            upstream = "cdn"
+
+        self.requests[f"{upstream} {request.method} {route}"] += 1
+        return response
+
+    def request_count(self) -> int:
+        return sum(self.requests.values())
@@ -0,0 +1,89 @@
+"""
+Cost of one `continous_save` tick with a large conference.
+
+    python -m benchmarks.persistence [--events 2000] [--log-lines 50]
+
+Compares the old deep-copy-and-compare check against the dirty tracking of
+`PersistentData.save`, both for idle ticks and for ticks where a single event changed.
+"""
+
+import argparse
+from pathlib import Path
+import tempfile
+import time
+
+from transcribee_voctoweb.persistent_data import EventLog, PersistentData, State
+from transcribee_voctoweb.storage import SqliteStorage
+
+
+def build_data(n_events: int, n_log_lines: int) -> PersistentData:
+    data = PersistentData()
+    for i in range(n_events):
+        event_state = data.add_event_state(f"event-{i}")
+        for j in range(n_log_lines):
+            event_state.add_log(f"Recoverable dependency error {j}")
+        event_state.switch_state(State.TRANSCRIBING)
+        event_state.transcribee_doc = f"doc-{i}"
+    return data
+
+
+def legacy_dump(data: PersistentData) -> dict:
+    """
+    The old shape of the state, with the log as part of every event state
+    """
+    return {
+        "event_states": {
+            guid: {**event_state.model_dump(), "log": EventLog.dump_python(event_state.log)}
+            for guid, event_state in data.event_states.items()
+        }
+    }
+
+
+def timed(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--log-lines", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    data = build_data(args.events, args.log_lines)
+
+    # what save_json(only_if_changed=True) used to do on every tick
+    last_saved = data.model_copy(deep=True)
+
+    def legacy_idle_check():
+        if legacy_dump(last_saved) == legacy_dump(data):
+            return
+        data.model_copy(deep=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SqliteStorage(Path(tmp) / "bench.sqlite")
+        data.save(storage)
+
+        def idle_tick():
+            data.save(storage)
+
+        def single_change_tick():
+            data.event_states["event-0"].add_log("Checked status")
+            data.save(storage)
+
+        legacy = timed(legacy_idle_check, max(1, args.repeat // 10))
+        idle = timed(idle_tick, args.repeat * 1000)
+        single = timed(single_change_tick, args.repeat)
+        storage.close()
+
+    print(f"{args.events} events, {args.log_lines} log lines each")
+    print(f"  legacy idle check:   {legacy * 1e3:10.3f} ms")
+    print(f"  idle tick:           {idle * 1e3:10.6f} ms")
+    print(f"  single change tick:  {single * 1e3:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
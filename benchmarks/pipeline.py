@@ -0,0 +1,229 @@
+"""
+Runs the periodic tasks of `transcribee_voctoweb.main` against the in-process
+fakes in benchmarks/fake_servers.py for synthetic conferences.
+
+    python -m benchmarks.pipeline [--events 100 1000 5000] [--latency 0.001]
+
+For every conference size this measures a cold, an unchanged (ETag) and an
+unchanged (no validators, body hash) `update_conference`, then `process_events`
+ticks through submission, polling and export. Every tick reports its own latency,
+the time until the scheduler is idle again, the requests it caused and the cost of
+the following `save`. Stage concurrency etc. are taken from the usual settings,
+so they can be changed with environment variables.
+
+Before measuring, it checks that unchanged conference listings are not parsed.
+"""
+
+import argparse
+import asyncio
+from contextlib import contextmanager
+import logging
+from pathlib import Path
+import tempfile
+import time
+from unittest import mock
+
+import httpx
+
+from benchmarks.fake_servers import (
+    TRANSCRIBEE_URL,
+    VOC_URL,
+    FakeTranscribee,
+    FakeUpstreams,
+    FakeVoctoweb,
+)
+from transcribee_voctoweb import main as glue
+from transcribee_voctoweb.backpressure import Backpressure
+from transcribee_voctoweb.config import settings
+from transcribee_voctoweb.document_index import DocumentIndex
+from transcribee_voctoweb.event_index import EventIndex
+from transcribee_voctoweb.export_cache import ExportCache
+from transcribee_voctoweb.persistent_data import PersistentData
+from transcribee_voctoweb.poll_planner import PollPlanner
+from transcribee_voctoweb.scheduler import Scheduler
+from transcribee_voctoweb.storage import SqliteStorage
+from transcribee_voctoweb.submission_priority import SubmissionPriority
+from transcribee_voctoweb.subtitle_formatting import format_subtitle_vtt
+from transcribee_voctoweb.transcribee_api.client import TranscribeeApiClient
+from transcribee_voctoweb.voc_api.client import VocPublishingApiClient
+from transcribee_voctoweb.voc_api.model import Conference
+
+
+def setup_pipeline(upstreams: FakeUpstreams, tmp: Path) -> SqliteStorage:
+    """
+    Sets up the globals of the app like `lifespan` does, but talking to the fakes
+    """
+    settings.limit_events = None
+    # submit all events in one tick, so the ticks stay comparable between sizes
+    settings.submit_top_n = 1_000_000
+    settings.download_dir = tmp / "downloads"
+
+    storage = SqliteStorage(tmp / "bench.sqlite")
+    glue.storage = storage
+    glue.pipeline_running = True
+    glue.persistent_data = PersistentData.load(storage)
+    glue.http_client = httpx.AsyncClient(transport=upstreams.transport)
+    glue.transcribee_api = TranscribeeApiClient(
+        base_url=TRANSCRIBEE_URL,
+        token="token",
+        api_token="api-token",
+        client=glue.http_client,
+    )
+    glue.voc_api = VocPublishingApiClient(
+        base_url=VOC_URL,
+        token="token",
+        event_cache_size=settings.event_cache_size,
+        event_cache_ttl=settings.event_cache_ttl,
+        client=glue.http_client,
+    )
+    glue.events = []
+    glue.conference_events = {}
+    glue.event_index = EventIndex(settings.default_conference)
+    glue.persistent_data.add_listener(glue.event_index.on_change)
+    glue.document_index = DocumentIndex(glue.transcribee_api)
+    glue.export_cache = ExportCache(max_memory_bytes=settings.export_cache_memory_bytes)
+    glue.uploads_requested_at = None
+    glue.poll_planner = PollPlanner(
+        min_interval=settings.poll_min_interval,
+        max_interval=settings.poll_max_interval,
+        eta_factor=settings.poll_eta_factor,
+    )
+
+    glue.submission_priority = SubmissionPriority()
+    glue.backpressure = Backpressure(
+        max_in_flight=settings.max_in_flight_documents,
+        max_queued_cost=settings.max_queued_cost,
+    )
+    glue.latest_queue_info = None
+    glue.scheduler = Scheduler(weights=settings.conference_weights)
+    for name, step, concurrency in (
+        ("submit", glue.submit, settings.submit_concurrency),
+        ("poll", glue.poll, settings.poll_concurrency),
+        ("export", glue.export, settings.export_concurrency),
+        ("republish", glue.republish, settings.export_concurrency),
+    ):
+        glue.scheduler.add_stage(
+            name,
+            glue.stage_handler(step),
+            concurrency=concurrency,
+            queue_depth=settings.scheduler_queue_depth,
+        )
+    glue.scheduler.start()
+    return storage
+
+
+@contextmanager
+def count_conference_parses():
+    with mock.patch.object(
+        Conference, "model_validate_json", wraps=Conference.model_validate_json
+    ) as parse:
+        yield parse
+
+
+async def wait_idle(scheduler: Scheduler):
+    while any(stage["queued"] or stage["running"] for stage in scheduler.stats().values()):
+        await asyncio.sleep(0.001)
+
+
+async def measure_update_conference(upstreams: FakeUpstreams, label: str, expected_parses: int):
+    before = upstreams.request_count()
+    with count_conference_parses() as parse:
+        start = time.perf_counter()
+        await glue.update_conference()
+        duration = time.perf_counter() - start
+
+    if parse.call_count != expected_parses:
+        raise SystemExit(
+            f"update_conference ({label}) parsed the conference {parse.call_count} times, "
+            f"expected {expected_parses}"
+        )
+    print(
+        f"  update_conference {label:<22} {duration * 1e3:9.2f} ms "
+        f"{upstreams.request_count() - before:6} requests {parse.call_count:3} parses"
+    )
+
+
+async def measure_tick(upstreams: FakeUpstreams, storage: SqliteStorage, label: str):
+    upstreams.requests.clear()
+
+    start = time.perf_counter()
+    await glue.process_events()
+    tick = time.perf_counter() - start
+
+    await wait_idle(glue.scheduler)
+    drained = time.perf_counter() - start
+
+    dirty = len(glue.persistent_data._dirty | glue.persistent_data._dirty_logs)
+    start = time.perf_counter()
+    glue.persistent_data.save(storage)
+    save = time.perf_counter() - start
+
+    print(
+        f"  tick {label:<33} {tick * 1e3:9.2f} ms tick {drained:9.3f} s until idle "
+        f"{upstreams.request_count():6} requests {dirty:6} dirty {save * 1e3:8.2f} ms save"
+    )
+    for route, count in sorted(upstreams.requests.items()):
+        print(f"      {route:<40} {count:6}")
+
+
+async def run(n_events: int, args: argparse.Namespace):
+    voctoweb = FakeVoctoweb(
+        settings.default_conference,
+        n_events,
+        recording_size=args.recording_size,
+        description_size=args.description_size,
+    )
+    transcribee = FakeTranscribee(vtt_seconds=args.vtt_minutes * 60)
+    upstreams = FakeUpstreams(voctoweb, transcribee, latency=args.latency)
+
+    print(f"{n_events} events, {args.latency * 1e3:.1f} ms latency")
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = setup_pipeline(upstreams, Path(tmp))
+        try:
+            await measure_update_conference(upstreams, "cold", expected_parses=1)
+            await measure_update_conference(upstreams, "unchanged (etag)", expected_parses=0)
+            # without an ETag the client has to compare the body hash
+            voctoweb.validators = False
+            await measure_update_conference(upstreams, "unchanged (hash)", expected_parses=0)
+            voctoweb.add_event()
+            await measure_update_conference(upstreams, "one event added", expected_parses=1)
+
+            await measure_tick(upstreams, storage, "submit all")
+            await measure_tick(upstreams, storage, "first poll")
+            transcribee.finish(args.finished)
+            # the planner postpones the next poll, pretend that time has passed
+            glue.poll_planner._next_poll.clear()
+            await measure_tick(upstreams, storage, f"poll, {args.finished:.0%} finished")
+            await measure_tick(upstreams, storage, "idle")
+        finally:
+            await glue.scheduler.stop()
+            storage.close()
+            await glue.http_client.aclose()
+
+    start = time.perf_counter()
+    format_subtitle_vtt(transcribee.vtt)
+    duration = time.perf_counter() - start
+    size_mb = len(transcribee.vtt.encode()) / 1e6
+    print(f"  format_subtitle_vtt {size_mb:.2f} MB export: {size_mb / duration:.2f} MB/s")
+    print(f"  voctoweb received {voctoweb.uploads} subtitle uploads\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--latency", type=float, default=0.001, help="seconds per request")
+    parser.add_argument("--recording-size", type=int, default=16 * 1024, help="bytes")
+    parser.add_argument("--description-size", type=int, default=2000, help="bytes per event")
+    parser.add_argument("--vtt-minutes", type=float, default=45)
+    parser.add_argument("--finished", type=float, default=0.5, help="fraction of transcriptions to finish")
+    args = parser.parse_args()
+
+    # main configures debug logging on import
+    logging.getLogger().setLevel(logging.WARNING)
+
+    for n_events in args.events:
+        asyncio.run(run(n_events, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Throughput and peak memory of `format_subtitle_vtt` on multi-hour transcripts.
+
+    python -m benchmarks.subtitle_formatting [--hours 1 2 4 8]
+
+Before measuring, the output is checked against the golden files in
+benchmarks/golden/ (`<name>.vtt` formats to `<name>.formatted`). The previous
+webvtt-py based implementation is measured for comparison.
+"""
+
+import argparse
+import gc
+import io
+from pathlib import Path
+import time
+import tracemalloc
+
+import webvtt
+
+from benchmarks.transcripts import generate_vtt
+from transcribee_voctoweb.subtitle_formatting import format_subtitle_vtt
+
+GOLDEN_DIR = Path(__file__).parent / "golden"
+
+
+def legacy_format_subtitle_vtt(vtt: str) -> str:
+    """
+    The webvtt object pipeline that `format_subtitle_vtt` replaced
+    """
+    captions: list[webvtt.Caption] = []
+    current_caption: webvtt.Caption | None = None
+    for caption in webvtt.read_buffer(io.StringIO(vtt)):
+        if current_caption is None:
+            current_caption = caption
+            continue
+
+        if len(current_caption.text) + len(caption.text) < 100:
+            current_caption = webvtt.Caption(
+                start=min(current_caption.start, caption.start),
+                end=max(current_caption.end, caption.end),
+                text=current_caption.raw_text + caption.raw_text,
+            )
+        else:
+            line = ""
+            lines = []
+            for word in current_caption.text.split(" "):
+                if len(line) + len(word) > 60 and line != "":
+                    lines.append(line)
+                    line = word
+                else:
+                    line += " " + word
+
+            lines.append(line)
+
+            captions.append(webvtt.Caption(
+                start=current_caption.start,
+                end=current_caption.end,
+                text="\n".join(lines).strip(),
+            ))
+
+            current_caption = caption
+
+    output_stream = io.StringIO()
+    webvtt.WebVTT(captions=captions).write(output_stream, format="vtt")
+    return output_stream.getvalue()
+
+
+def _read(path: Path) -> str:
+    # keep "\r\n" line endings, they are part of what is tested
+    with open(path, newline="") as file:
+        return file.read()
+
+
+def check_golden_files():
+    inputs = sorted(GOLDEN_DIR.glob("*.vtt"))
+    for input_path in inputs:
+        expected = _read(input_path.with_suffix(".formatted"))
+        actual = format_subtitle_vtt(_read(input_path))
+        if actual != expected:
+            raise SystemExit(f"Output for {input_path.name} does not match the golden file")
+    print(f"{len(inputs)} golden files match")
+
+
+def measure(func, vtt: str) -> tuple[float, int]:
+    gc.collect()
+    start = time.perf_counter()
+    func(vtt)
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(vtt)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    check_golden_files()
+
+    print(f"{'hours':>6} {'input MB':>9} {'impl':>8} {'time s':>8} {'MB/s':>8} {'peak MB':>8}")
+    for hours in args.hours:
+        vtt = generate_vtt(hours * 3600)
+        size_mb = len(vtt.encode()) / 1e6
+        if legacy_format_subtitle_vtt(vtt) != format_subtitle_vtt(vtt):
+            raise SystemExit(f"Implementations disagree on the {hours}h transcript")
+
+        for name, func in (("legacy", legacy_format_subtitle_vtt), ("stream", format_subtitle_vtt)):
+            duration, peak = measure(func, vtt)
+            print(
+                f"{hours:>6} {size_mb:>9.2f} {name:>8} {duration:>8.3f} "
+                f"{size_mb / duration:>8.2f} {peak / 1e6:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Synthetic transcribee VTT exports for the benchmarks
+"""
+
+import random
+
+WORDS = (
+    "the of and to in is that for it as was with be by on not he this are or his from at "
+    "which but have an they you were her she there been one all we their has would when if "
+    "so no will can more other its about into them only some time could these two may then "
+    "do first any like my now over such our man me even most made after also did many before "
+    "must through back years where much your way well down should because each just those "
+    "people congress chaos computer club hacker encryption network protocol subtitles"
+).split()
+
+
+def _timestamp(seconds: float) -> str:
+    hours, rest = divmod(seconds, 3600)
+    minutes, rest = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{rest:06.3f}"
+
+
+def generate_vtt(duration_seconds: float, seed: int = 0) -> str:
+    """
+    A VTT export with word timings, roughly as transcribee produces it: one cue per
+    few words, every word wrapped in a timestamp and a <c> tag.
+    """
+    rng = random.Random(seed)
+    lines = ["WEBVTT", ""]
+    time = 0.0
+    while time < duration_seconds:
+        start = time
+        words = []
+        for _ in range(rng.randint(2, 9)):
+            words.append(f"<{_timestamp(time)}><c> {rng.choice(WORDS)}</c>")
+            time += rng.uniform(0.15, 0.6)
+        lines.append(f"{_timestamp(start)} --> {_timestamp(time)}")
+        lines.append("".join(words))
+        lines.append("")
+        time += rng.uniform(0, 1.5)
+    return "\n".join(lines)
@@ -0,0 +1,151 @@
+import asyncio
+
+import httpx
+import pytest
+
+from transcribee_voctoweb.helpers import circuit_breaker
+from transcribee_voctoweb.helpers.circuit_breaker import (
+    BreakerState,
+    CircuitBreaker,
+    CircuitOpenError,
+    is_outage,
+)
+
+REQUEST = httpx.Request("GET", "http://voctoweb.test/api/conferences/37c3")
+
+
+def status_error(status: int) -> httpx.HTTPStatusError:
+    return httpx.HTTPStatusError("error", request=REQUEST, response=httpx.Response(status, request=REQUEST))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+    return clock
+
+
+async def call(breaker: CircuitBreaker, error: Exception | None = None):
+    async with breaker:
+        if error is not None:
+            raise error
+
+
+def run(breaker: CircuitBreaker, error: Exception | None = None):
+    try:
+        asyncio.run(call(breaker, error))
+    except Exception as exc:
+        return exc
+
+
+def test_opens_after_threshold_and_closes_after_a_successful_probe(clock: FakeClock):
+    breaker = CircuitBreaker("voctoweb", failure_threshold=3, reset_timeout=30)
+
+    for _ in range(2):
+        run(breaker, httpx.ConnectError("refused"))
+    assert breaker.state == BreakerState.CLOSED
+
+    run(breaker, httpx.ConnectError("refused"))
+    assert breaker.state == BreakerState.OPEN
+
+    # no request goes out while open
+    assert isinstance(run(breaker), CircuitOpenError)
+    assert breaker.retry_after() == 30
+
+    clock.now += 30
+    assert run(breaker) is None
+    assert breaker.state == BreakerState.CLOSED and breaker.failures == 0
+
+
+def test_failed_probe_reopens(clock: FakeClock):
+    breaker = CircuitBreaker("voctoweb", failure_threshold=1, reset_timeout=30)
+    run(breaker, status_error(503))
+    clock.now += 30
+
+    run(breaker, status_error(502))
+    assert breaker.state == BreakerState.OPEN
+    assert breaker.retry_after() == 30
+
+
+def test_only_one_probe_at_a_time(clock: FakeClock):
+    breaker = CircuitBreaker("voctoweb", failure_threshold=1, reset_timeout=30)
+    run(breaker, httpx.ConnectError("refused"))
+    clock.now += 30
+
+    async def probe_and_second_request():
+        probe_started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def probe():
+            async with breaker:
+                probe_started.set()
+                await release.wait()
+
+        task = asyncio.create_task(probe())
+        await probe_started.wait()
+        assert breaker.state == BreakerState.HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await call(breaker)
+        release.set()
+        await task
+
+    asyncio.run(probe_and_second_request())
+    assert breaker.state == BreakerState.CLOSED
+
+
+def test_cancelled_probe_lets_the_next_request_probe(clock: FakeClock):
+    breaker = CircuitBreaker("voctoweb", failure_threshold=1, reset_timeout=30)
+    run(breaker, httpx.ConnectError("refused"))
+    clock.now += 30
+
+    async def cancelled_probe():
+        async def probe():
+            async with breaker:
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(probe())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_probe())
+    assert breaker.state == BreakerState.HALF_OPEN
+
+    assert run(breaker) is None
+    assert breaker.state == BreakerState.CLOSED
+
+
+def test_request_errors_are_not_counted(clock: FakeClock):
+    breaker = CircuitBreaker("voctoweb", failure_threshold=2, reset_timeout=30)
+    run(breaker, httpx.ConnectError("refused"))
+    run(breaker, status_error(404))
+    run(breaker, httpx.ConnectError("refused"))
+
+    assert breaker.state == BreakerState.CLOSED and breaker.failures == 1
+
+
+@pytest.mark.parametrize(
+    "error, outage",
+    [
+        (httpx.ConnectError("refused"), True),
+        (httpx.ReadTimeout("timeout"), True),
+        (CircuitOpenError("voctoweb", 30), True),
+        (status_error(500), True),
+        (status_error(503), True),
+        (status_error(429), True),
+        (status_error(404), False),
+        (status_error(422), False),
+        (ValueError("invalid json"), False),
+    ],
+)
+def test_is_outage(error: Exception, outage: bool):
+    assert is_outage(error) == outage
@@ -0,0 +1,124 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from transcribee_voctoweb.helpers.download import DownloadError, download_recording
+
+URL = "http://cdn.test/37c3-1-eng-talk.mp4"
+CHUNK_SIZE = 4096
+
+
+class BrokenStream(httpx.AsyncByteStream):
+    """
+    Sends `content` in chunks and drops the connection after `fail_after` bytes
+    """
+
+    def __init__(self, content: bytes, fail_after: int | None):
+        self.content = content
+        self.fail_after = fail_after
+
+    async def __aiter__(self):
+        for start in range(0, len(self.content), CHUNK_SIZE):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise httpx.ReadError("connection reset")
+            yield self.content[start : start + CHUNK_SIZE]
+
+
+class FakeCdn:
+    def __init__(self, content: bytes, ranges: bool = True):
+        self.content = content
+        self.ranges = ranges
+        # bytes after which the next GET drops the connection
+        self.fail_after: list[int] = []
+        self.range_headers: list[str | None] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        headers = {"content-length": str(len(self.content))}
+        if self.ranges:
+            headers["accept-ranges"] = "bytes"
+        if request.method == "HEAD":
+            return httpx.Response(200, headers=headers)
+
+        range_header = request.headers.get("range")
+        self.range_headers.append(range_header)
+        status, body = 200, self.content
+        if self.ranges and range_header is not None:
+            start, end = range_header.removeprefix("bytes=").split("-")
+            body = self.content[int(start) : int(end) + 1 if end else None]
+            status = 206
+            headers["content-range"] = f"bytes {start}-{int(start) + len(body) - 1}/{len(self.content)}"
+        headers["content-length"] = str(len(body))
+
+        fail_after = self.fail_after.pop(0) if self.fail_after else None
+        return httpx.Response(status, headers=headers, stream=BrokenStream(body, fail_after))
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+
+def download(cdn: FakeCdn, dest, **kwargs):
+    return asyncio.run(download_recording(cdn.client(), URL, dest, **kwargs))
+
+
+def test_interrupted_download_is_resumed_with_a_range_request(tmp_path):
+    cdn = FakeCdn(os.urandom(100_000))
+    cdn.fail_after = [40_000]
+    dest = tmp_path / "event.mp4"
+
+    with pytest.raises(httpx.ReadError):
+        download(cdn, dest)
+    assert (tmp_path / "event.mp4.progress").exists()
+
+    assert download(cdn, dest) == dest
+    assert dest.read_bytes() == cdn.content
+    assert cdn.range_headers == [None, "bytes=40960-99999"]
+
+
+def test_download_restarts_if_the_server_ignores_the_range(tmp_path):
+    cdn = FakeCdn(os.urandom(100_000), ranges=False)
+    cdn.fail_after = [40_000]
+    dest = tmp_path / "event.mp4"
+
+    with pytest.raises(httpx.ReadError):
+        download(cdn, dest)
+    download(cdn, dest)
+
+    assert dest.read_bytes() == cdn.content
+    assert cdn.range_headers == [None, "bytes=40960-99999"]
+
+
+def test_segments_are_resumed_independently(tmp_path):
+    cdn = FakeCdn(os.urandom(100_000))
+    # the second of the four segments breaks
+    cdn.fail_after = [100_000, 10_000, 100_000, 100_000]
+    dest = tmp_path / "event.mp4"
+
+    with pytest.raises(httpx.ReadError):
+        download(cdn, dest, segments=4, min_segment_size=10_000)
+    cdn.range_headers.clear()
+    download(cdn, dest, segments=4, min_segment_size=10_000)
+
+    assert dest.read_bytes() == cdn.content
+    # the other segments are either complete or picked up where they stopped
+    assert "bytes=37288-49999" in cdn.range_headers
+
+
+def test_finished_download_is_not_requested_again(tmp_path):
+    cdn = FakeCdn(os.urandom(10_000))
+    dest = tmp_path / "event.mp4"
+
+    download(cdn, dest)
+    download(cdn, dest)
+
+    assert cdn.range_headers == [None]
+
+
+def test_size_mismatch_with_voctoweb_discards_the_download(tmp_path):
+    cdn = FakeCdn(os.urandom(10_000))
+    dest = tmp_path / "event.mp4"
+
+    with pytest.raises(DownloadError):
+        download(cdn, dest, expected_size_mb=5)
+    assert not dest.exists() and not (tmp_path / "event.mp4.progress").exists()
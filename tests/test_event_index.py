@@ -0,0 +1,86 @@
+import pytest
+
+from transcribee_voctoweb.event_index import EventIndex
+from transcribee_voctoweb.persistent_data import PersistentData, State
+from transcribee_voctoweb.voc_api.model import EventSummary
+
+
+def make_events(count: int, prefix: str = "event") -> list[EventSummary]:
+    return [
+        EventSummary(
+            guid=f"{prefix}-{i}",
+            slug=f"{prefix}-{i}",
+            title=f"{prefix} {i}",
+            date=f"2023-12-{i + 1:02d}T10:00:00+01:00",
+            video={"filename": f"{prefix}-{i}.mp4"},
+        )
+        for i in range(count)
+    ]
+
+
+def make_index(events: list[EventSummary]) -> tuple[EventIndex, PersistentData]:
+    persistent_data = PersistentData()
+    for event in events:
+        persistent_data.add_event_state(event.guid, "37c3")
+    index = EventIndex("37c3")
+    persistent_data.add_listener(index.on_change)
+    return index, persistent_data
+
+
+def all_pages(index: EventIndex, events, persistent_data, **query) -> list[list[str]]:
+    pages = []
+    cursor = None
+    while True:
+        page = index.query(events, persistent_data, cursor=cursor, limit=3, **query)
+        pages.append([row.guid for row in page.rows])
+        if page.next_cursor is None:
+            return pages
+        cursor = page.next_cursor
+
+
+def test_rebuilds_after_invalidate_for_a_listing_with_the_same_id():
+    events = make_events(3)
+    index, persistent_data = make_index(events)
+    assert index.query(events, persistent_data).total == 3
+
+    # the new listing may get the id of the old one
+    events[:] = make_events(2, prefix="other")
+    for event in events:
+        persistent_data.add_event_state(event.guid, "37c3")
+    index.invalidate()
+
+    page = index.query(events, persistent_data)
+    assert [row.guid for row in page.rows] == ["other-0", "other-1"]
+    assert page.total == 2 and page.counts[State.NEW.value] == 2
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_cursor_pages_cover_all_events_once(descending: bool):
+    events = make_events(8)
+    index, persistent_data = make_index(events)
+
+    pages = all_pages(index, events, persistent_data, descending=descending)
+
+    expected = [event.guid for event in events]
+    if descending:
+        expected.reverse()
+    assert [len(page) for page in pages] == [3, 3, 2]
+    assert [guid for page in pages for guid in page] == expected
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_cursor_stays_valid_when_a_state_changes(descending: bool):
+    events = make_events(8)
+    index, persistent_data = make_index(events)
+
+    first = index.query(events, persistent_data, state=State.NEW, descending=descending, limit=3)
+    # an event of the next page leaves the filter between two requests
+    next_guid = "event-3" if not descending else "event-4"
+    persistent_data.event_states[next_guid].switch_state(State.TRANSCRIBING)
+
+    second = index.query(
+        events, persistent_data, state=State.NEW, descending=descending, cursor=first.next_cursor, limit=3
+    )
+    expected = ["event-4", "event-5", "event-6"] if not descending else ["event-3", "event-2", "event-1"]
+    assert [row.guid for row in second.rows] == expected
+    assert second.total == 7
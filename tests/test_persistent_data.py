@@ -0,0 +1,32 @@
+import sqlite3
+
+import pytest
+
+from transcribee_voctoweb.persistent_data import PersistentData, State
+from transcribee_voctoweb.storage import SqliteStorage
+
+
+class FailingStorage(SqliteStorage):
+    fail = True
+
+    def write_logs(self, logs: dict[str, str]):
+        if self.fail:
+            raise sqlite3.OperationalError("disk I/O error")
+        super().write_logs(logs)
+
+
+def test_failed_save_is_written_by_the_next_save(tmp_path):
+    storage = FailingStorage(tmp_path / "data.sqlite")
+    data = PersistentData()
+    data.add_event_state("event-1", "37c3").switch_state(State.TRANSCRIBING)
+
+    with pytest.raises(sqlite3.OperationalError):
+        data.save(storage)
+
+    storage.fail = False
+    assert data.save(storage) > 0
+    assert data.save(storage) == 0
+
+    loaded = PersistentData.load(storage)
+    assert loaded.event_states["event-1"].state == State.TRANSCRIBING
+    assert loaded.event_states["event-1"].log[-1].msg.startswith("Switching")
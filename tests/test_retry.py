@@ -0,0 +1,64 @@
+import datetime
+import email.utils
+
+import httpx
+import pytest
+
+from transcribee_voctoweb.helpers.retry import (
+    RetryLaterError,
+    backoff_delay,
+    parse_retry_after,
+    raise_for_status,
+)
+
+
+def http_date(seconds_from_now: float) -> str:
+    date = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=seconds_from_now)
+    return email.utils.format_datetime(date, usegmt=True)
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("1.5") == 1.5
+    assert parse_retry_after("-5") == 0
+
+
+def test_parse_retry_after_http_date():
+    assert parse_retry_after(http_date(120)) == pytest.approx(120, abs=2)
+    assert parse_retry_after(http_date(-120)) == 0
+
+
+@pytest.mark.parametrize("value", ["", "soon", "Wed, 99 Foo 2024"])
+def test_parse_retry_after_invalid(value: str):
+    assert parse_retry_after(value) is None
+
+
+def response(status: int, headers: dict[str, str] | None = None) -> httpx.Response:
+    return httpx.Response(status, headers=headers, request=httpx.Request("GET", "http://transcribee.test/"))
+
+
+def test_raise_for_status_with_retry_after():
+    with pytest.raises(RetryLaterError) as exc_info:
+        raise_for_status(response(429, {"retry-after": "30"}))
+    assert exc_info.value.retry_after == 30
+
+
+@pytest.mark.parametrize(
+    "status, headers", [(503, {}), (503, {"retry-after": "soon"}), (500, {"retry-after": "30"})]
+)
+def test_raise_for_status_without_usable_retry_after(status: int, headers: dict[str, str]):
+    with pytest.raises(httpx.HTTPStatusError) as exc_info:
+        raise_for_status(response(status, headers))
+    assert not isinstance(exc_info.value, RetryLaterError)
+
+
+def test_backoff_delay_doubles_with_jitter():
+    for exponent in range(5):
+        delay = backoff_delay(exponent, base=10, maximum=3600)
+        assert 10 * 2**exponent / 2 <= delay <= 10 * 2**exponent
+
+
+@pytest.mark.parametrize("exponent", [20, 1000, 10**6])
+def test_backoff_delay_is_capped(exponent: int):
+    delay = backoff_delay(exponent, base=10, maximum=3600)
+    assert 1800 <= delay <= 3600
@@ -0,0 +1,24 @@
+from transcribee_voctoweb.submission_priority import interleave
+
+
+def test_interleave_shares_slots_by_weight():
+    ranked = {
+        "congress": [f"congress-{i}" for i in range(400)],
+        "small": ["small-0", "small-1"],
+    }
+
+    assert interleave(ranked, {}, 4) == ["congress-0", "small-0", "congress-1", "small-1"]
+    assert interleave(ranked, {"congress": 2}, 6) == [
+        "congress-0",
+        "congress-1",
+        "small-0",
+        "congress-2",
+        "congress-3",
+        "small-1",
+    ]
+
+
+def test_interleave_fills_slots_when_a_conference_runs_out():
+    ranked = {"congress": ["congress-0", "congress-1", "congress-2"], "small": ["small-0"], "empty": []}
+
+    assert interleave(ranked, {}, 10) == ["congress-0", "small-0", "congress-1", "congress-2"]
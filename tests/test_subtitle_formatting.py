@@ -0,0 +1,19 @@
+from pathlib import Path
+
+import pytest
+
+from transcribee_voctoweb.subtitle_formatting import format_subtitle_vtt
+
+GOLDEN_DIR = Path(__file__).parent.parent / "benchmarks" / "golden"
+
+
+def _read(path: Path) -> str:
+    # keep "\r\n" line endings, they are part of what is tested
+    with open(path, newline="") as file:
+        return file.read()
+
+
+@pytest.mark.parametrize("input_path", sorted(GOLDEN_DIR.glob("*.vtt")), ids=lambda path: path.stem)
+def test_golden_file(input_path: Path):
+    expected = _read(input_path.with_suffix(".formatted"))
+    assert format_subtitle_vtt(_read(input_path)) == expected
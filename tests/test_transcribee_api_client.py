@@ -0,0 +1,45 @@
+import asyncio
+
+import httpx
+
+from transcribee_voctoweb.transcribee_api.client import DocumentBodyWithFile, TranscribeeApiClient
+
+DOCUMENT = {
+    "id": "doc-1",
+    "name": "Talk",
+    "created_at": "2023-12-27T10:00:00",
+    "changed_at": "2023-12-27T10:00:00",
+    "tasks": [],
+    "media_files": [],
+    "has_full_access": True,
+}
+
+
+def test_create_document_from_downloaded_file(tmp_path):
+    video_path = tmp_path / "event.mp4"
+    video_path.write_bytes(b"video" * 1000)
+    uploaded = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        uploaded.append(request.read())
+        return httpx.Response(200, json=DOCUMENT)
+
+    client = TranscribeeApiClient(
+        base_url="http://transcribee.test",
+        token="token",
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handle)),
+    )
+
+    # the way `create_document_downloaded` opens the recording
+    with open(video_path, "rb") as video_file:
+        document = DocumentBodyWithFile(
+            name="Talk",
+            file=video_file,
+            model="large-v3",
+            language="auto",
+            number_of_speakers=None,
+        )
+        doc = asyncio.run(client.create_document(document))
+
+    assert doc.id == "doc-1"
+    assert b"video" * 1000 in uploaded[0]
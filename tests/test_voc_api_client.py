@@ -0,0 +1,75 @@
+import asyncio
+import json
+from unittest import mock
+
+import httpx
+import pytest
+
+from transcribee_voctoweb.voc_api.client import VocPublishingApiClient
+from transcribee_voctoweb.voc_api.model import Conference
+
+EVENT = {
+    "guid": "0c8f6a3e-8bb5-4a63-a2f9-2f27b3a3c1a1",
+    "slug": "37c3-1-talk",
+    "title": "Talk",
+    "date": "2023-12-27T10:00:00+01:00",
+    "video": {"filename": "37c3-1-eng-talk.mp4"},
+}
+
+
+class FakeVoctoweb:
+    def __init__(self, etag: bool):
+        self.etag = etag
+        self.body = {"id": "37c3", "title": "37C3", "events": [EVENT]}
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        content = json.dumps(self.body).encode()
+        headers = {}
+        if self.etag:
+            headers["etag"] = f'"{hash(content)}"'
+            if request.headers.get("if-none-match") == headers["etag"]:
+                return httpx.Response(304, headers=headers)
+        return httpx.Response(200, content=content, headers=headers)
+
+
+def get_conference(client: VocPublishingApiClient) -> tuple[Conference | None, int]:
+    with mock.patch.object(
+        Conference, "model_validate_json", wraps=Conference.model_validate_json
+    ) as parse:
+        conference = asyncio.run(client.get_conference("37c3", only_if_changed=True))
+    return conference, parse.call_count
+
+
+def make_client(server: FakeVoctoweb) -> VocPublishingApiClient:
+    return VocPublishingApiClient(
+        base_url="http://voctoweb.test/api/conferences",
+        token="token",
+        client=httpx.AsyncClient(transport=httpx.MockTransport(server.handle)),
+    )
+
+
+@pytest.mark.parametrize("etag", [True, False])
+def test_unchanged_conference_is_not_parsed(etag: bool):
+    server = FakeVoctoweb(etag=etag)
+    client = make_client(server)
+
+    conference, parses = get_conference(client)
+    assert conference is not None and parses == 1
+
+    assert get_conference(client) == (None, 0)
+
+    server.body["events"].append({**EVENT, "guid": "5f0a1a52-6f31-4d5c-9e43-3d4d24b8f6b2"})
+    conference, parses = get_conference(client)
+    assert conference is not None and len(conference.events) == 2 and parses == 1
+
+
+@pytest.mark.parametrize("etag", [True, False])
+def test_conference_is_requested_again_after_a_parse_error(etag: bool):
+    client = make_client(FakeVoctoweb(etag=etag))
+
+    with mock.patch.object(Conference, "model_validate_json", side_effect=ValueError("broken")):
+        with pytest.raises(ValueError):
+            asyncio.run(client.get_conference("37c3", only_if_changed=True))
+
+    conference, parses = get_conference(client)
+    assert conference is not None and parses == 1
@@ -0,0 +1,47 @@
+import logging
+
+from transcribee_voctoweb.transcribee_api.model import TaskQueueInfoResponse
+
+
+def queued_cost(queue_info: TaskQueueInfoResponse) -> float:
+    return sum(task.remaining_cost for task in queue_info.open_tasks)
+
+
+class Backpressure:
+    """
+    Holds back submissions while transcribee is busy: while more of our documents
+    than `max_in_flight` are being transcribed, or while the open tasks of all
+    transcribee users have more remaining cost than `max_queued_cost`. Checked
+    every tick, so submissions are released as soon as capacity frees up.
+    """
+
+    def __init__(self, max_in_flight: int | None, max_queued_cost: float | None):
+        self.max_in_flight = max_in_flight
+        self.max_queued_cost = max_queued_cost
+        # why submissions are held, None while they are not
+        self.held: str | None = None
+
+    def allowed(self, in_flight: int, cost: float | None) -> int | None:
+        """
+        Number of documents that may be submitted now, None if unlimited
+        """
+        allowed = None
+        reason = None
+        if self.max_in_flight is not None:
+            allowed = max(self.max_in_flight - in_flight, 0)
+            if allowed == 0:
+                reason = f"{in_flight} documents in flight"
+
+        if self.max_queued_cost is not None and cost is not None and cost > self.max_queued_cost:
+            allowed = 0
+            reason = f"remaining cost of open tasks is {cost:.0f}"
+
+        self._set_held(reason)
+        return allowed
+
+    def _set_held(self, reason: str | None):
+        if reason is not None and self.held is None:
+            logging.info(f"Holding submissions: {reason}")
+        elif reason is None and self.held is not None:
+            logging.info("Releasing submissions")
+        self.held = reason
@@ -0,0 +1,203 @@
+"""
+Re-exports all transcribee documents and republishes their subtitles to voctoweb,
+e.g. after the line wrapping rules changed or after a mass correction sprint.
+
+    pdm republish [--concurrency 8] [--processes 4] [--force] [--dry-run]
+
+The event states are only read. The hashes of uploaded subtitles are handed to
+the server through its command queue, if it is not running it applies them on
+its next start.
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import hashlib
+import logging
+import time
+
+from transcribee_voctoweb.config import settings
+from transcribee_voctoweb.http_client import create_http_client
+from transcribee_voctoweb.persistent_data import REPUBLISHABLE_STATES, EventState, PersistentData
+from transcribee_voctoweb.storage import create_storage
+from transcribee_voctoweb.subtitle_formatting import format_subtitle_vtt
+from transcribee_voctoweb.transcribee_api.client import TranscribeeApiClient
+from transcribee_voctoweb.voc_api.client import VocPublishingApiClient
+from transcribee_voctoweb.workers import CommandQueue
+
+
+@dataclass
+class EventReport:
+    event_id: str
+    status: str = "pending"
+    timings: dict[str, float] = field(default_factory=dict)
+    error: str | None = None
+
+
+class Republisher:
+    def __init__(
+        self,
+        transcribee_api: TranscribeeApiClient,
+        voc_api: VocPublishingApiClient,
+        pool: ProcessPoolExecutor,
+        commands: CommandQueue,
+        concurrency: int,
+        force: bool,
+        dry_run: bool,
+    ):
+        self.transcribee_api = transcribee_api
+        self.voc_api = voc_api
+        self.pool = pool
+        self.commands = commands
+        self.force = force
+        self.dry_run = dry_run
+        self.export_limit = asyncio.Semaphore(concurrency)
+        self.upload_limit = asyncio.Semaphore(concurrency)
+
+    async def republish(self, event_id: str, event_state: EventState, report: EventReport):
+        assert event_state.transcribee_doc is not None
+        loop = asyncio.get_running_loop()
+        conference = event_state.conference or settings.default_conference
+
+        async with self.export_limit:
+            start = time.perf_counter()
+            event = await self.voc_api.get_event(conference, event_id)
+            vtt = await self.transcribee_api.export(
+                event_state.transcribee_doc, format="VTT", include_word_timing=True
+            )
+            report.timings["export"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        formatted_vtt = await loop.run_in_executor(self.pool, format_subtitle_vtt, vtt)
+        report.timings["format"] = time.perf_counter() - start
+
+        vtt_hash = hashlib.sha256(formatted_vtt.encode()).hexdigest()
+        if (
+            not self.force
+            and event_state.published_vtt_hash == vtt_hash
+            and event_state.published_vtt_language == event.original_language
+        ):
+            report.status = "unchanged"
+            return
+
+        if self.dry_run:
+            report.status = "would upload"
+            return
+
+        async with self.upload_limit:
+            start = time.perf_counter()
+            await self.voc_api.upload_vtt(
+                conference=conference,
+                event=event_id,
+                vtt=formatted_vtt,
+                language=event.original_language,
+            )
+            report.timings["upload"] = time.perf_counter() - start
+
+        # the event states belong to the server, it applies this on its next tick
+        self.commands.push(
+            "record_upload", event_id, {"vtt_hash": vtt_hash, "language": event.original_language}
+        )
+        report.status = "uploaded"
+
+    async def run(self, event_id: str, event_state: EventState) -> EventReport:
+        report = EventReport(event_id)
+        start = time.perf_counter()
+        try:
+            await self.republish(event_id, event_state, report)
+        except Exception as exc:
+            logging.debug(f"Republishing {event_id} failed", exc_info=exc)
+            report.status = "failed"
+            report.error = str(exc)
+        report.timings["total"] = time.perf_counter() - start
+        return report
+
+
+def print_report(reports: list[EventReport], duration: float):
+    print(f"{'event':<38} {'status':<13} {'export':>8} {'format':>8} {'upload':>8} {'total':>8}")
+    for report in sorted(reports, key=lambda report: report.timings.get("total", 0), reverse=True):
+        timings = [
+            f"{report.timings[step]:8.2f}" if step in report.timings else f"{'-':>8}"
+            for step in ("export", "format", "upload", "total")
+        ]
+        print(f"{report.event_id:<38} {report.status:<13} {' '.join(timings)}")
+        if report.error is not None:
+            print(f"  {report.error}")
+
+    counts: dict[str, int] = {}
+    for report in reports:
+        counts[report.status] = counts.get(report.status, 0) + 1
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"\n{len(reports)} events in {duration:.2f}s: {summary}")
+
+
+async def republish_all(args: argparse.Namespace):
+    if settings.storage_backend != "sqlite":
+        raise SystemExit("The republish cli needs the sqlite storage backend")
+
+    storage = create_storage(
+        settings.storage_backend,
+        data_path=settings.data_path,
+        database_path=settings.database_path,
+    )
+    # only read, the server might be running and owns the event states
+    persistent_data = PersistentData.load(storage)
+    storage.close()
+    commands = CommandQueue(settings.database_path)
+
+    http_client = create_http_client(settings)
+    transcribee_api = TranscribeeApiClient(
+        base_url=settings.transcribee_api_url,
+        token=settings.transcribee_pat,
+        client=http_client,
+    )
+    voc_api = VocPublishingApiClient(
+        base_url=settings.voc_api_url,
+        token=settings.voc_token,
+        client=http_client,
+    )
+
+    events = {
+        event_id: event_state
+        for event_id, event_state in persistent_data.event_states.items()
+        if event_state.state in REPUBLISHABLE_STATES and event_state.transcribee_doc is not None
+    }
+
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            republisher = Republisher(
+                transcribee_api,
+                voc_api,
+                pool,
+                commands,
+                concurrency=args.concurrency,
+                force=args.force,
+                dry_run=args.dry_run,
+            )
+            reports = await asyncio.gather(
+                *(republisher.run(event_id, event_state) for event_id, event_state in events.items())
+            )
+    finally:
+        commands.close()
+        await http_client.aclose()
+
+    print_report(list(reports), time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent requests per upstream")
+    parser.add_argument("--processes", type=int, default=None, help="formatting processes")
+    parser.add_argument("--force", action="store_true", help="upload even if the subtitles did not change")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be uploaded")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(republish_all(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+from dataclasses import dataclass, field
+
+from transcribee_voctoweb.voc_api.model import EventSummary
+
+
+@dataclass
+class ConferenceDiff:
+    added: list[EventSummary] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    changed: list[EventSummary] = field(default_factory=list)
+
+    def is_empty(self):
+        return not (self.added or self.removed or self.changed)
+
+
+def diff_events(old: list[EventSummary], new: list[EventSummary]) -> ConferenceDiff:
+    old_by_guid = {event.guid: event for event in old}
+    new_guids = set()
+
+    diff = ConferenceDiff()
+    for event in new:
+        new_guids.add(event.guid)
+        old_event = old_by_guid.get(event.guid)
+        if old_event is None:
+            diff.added.append(event)
+        elif old_event != event:
+            diff.changed.append(event)
+
+    diff.removed = [guid for guid in old_by_guid if guid not in new_guids]
+    return diff
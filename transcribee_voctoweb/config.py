@@ -1,3 +1,6 @@
+from pathlib import Path
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 from pydantic_settings.main import SettingsConfigDict
 
@@ -6,12 +9,109 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
     conference: str = "37c3"
+    # handle several conferences in one instance (json list), replaces `conference`
+    conferences: list[str] = []
+    # share of the pipeline a conference gets while several have work queued,
+    # conferences without a weight get 1
+    conference_weights: dict[str, float] = {}
+    # maximum number of events per conference
     limit_events: int | None = None
     transcribee_api_url: str = "https://beta.transcribee.net"
     transcribee_pat: str = "test"
+    # optional, enables ETA based polling via the task queue info
+    transcribee_api_token: str | None = None
 
     voc_api_url: str = "https://publishing.c3voc.de/api"
     voc_token: str = "test"
+    # event details are cached for this many seconds, or until the event changes
+    # in the conference listing
+    event_cache_ttl: float = 300
+    event_cache_size: int = 2000
+
+    storage_backend: Literal["sqlite", "json"] = "sqlite"
+    database_path: Path = Path("data.sqlite")
+    # legacy state file, imported into the database on first start
+    data_path: Path = Path("data.json")
+
+    # seconds to wait after the first error of an event, doubled after every
+    # further error up to retry_max_delay
+    retry_base_delay: float = 10
+    retry_max_delay: float = 3600
+    # lower cap while an event waits for its recording, publishing one does not
+    # show up in the conference listing
+    missing_recording_max_delay: float = 300
+
+    # stop sending requests to an upstream after this many outage errors in a row
+    breaker_failure_threshold: int = 5
+    # seconds until the first request is let through again to check for recovery
+    breaker_reset_timeout: float = 30
+
+    # maximum number of events waiting in each scheduler stage
+    scheduler_queue_depth: int = 1000
+    # number of concurrent downloads + submissions to transcribee
+    submit_concurrency: int = 2
+    # number of new events queued for submission at a time, the ones with the
+    # highest priority are picked
+    submit_top_n: int = 10
+    # hold submissions while this many of our documents are being transcribed
+    max_in_flight_documents: int | None = None
+    # hold submissions while the open transcribee tasks have more remaining cost
+    # (roughly worker seconds) than this, needs transcribee_api_token
+    max_queued_cost: float | None = None
+    # number of concurrent transcription status checks
+    poll_concurrency: int = 10
+    # number of concurrent exports to voctoweb
+    export_concurrency: int = 4
+
+    # connection pool shared by all upstream requests
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30
+    # needs the optional h2 package (`pip install httpx[http2]`)
+    http2: bool = False
+
+    # how old the transcribee document listing may be when looking up whether a
+    # document changed since its last export
+    document_index_max_age: float = 10
+    # raw and formatted exports of unchanged documents are served from this cache
+    export_cache_memory_bytes: int = 64 * 1024 * 1024
+    export_cache_dir: Path | None = None
+    export_cache_disk_bytes: int = 1024 * 1024 * 1024
+
+    # bounds for the adaptive polling interval of transcribing documents (seconds)
+    poll_min_interval: float = 10
+    poll_max_interval: float = 600
+    # poll again after this fraction of the estimated remaining queue time
+    poll_eta_factor: float = 0.5
+
+    # partially downloaded recordings are kept here, so downloads can be resumed
+    download_dir: Path = Path("downloads")
+    # recordings larger than 2 * download_min_segment_size are fetched as up to
+    # this many parallel byte ranges
+    download_segments: int = 4
+    download_min_segment_size: int = 64 * 1024 * 1024
+
+    # pipe recordings straight from voctoweb into transcribee instead of downloading
+    # them to disk first (only if voctoweb reports a content length)
+    stream_recordings: bool = False
+    # number of 64 KiB chunks buffered between download and upload when streaming
+    stream_buffer_chunks: int = 16
+
+    # set to run several uvicorn workers: only the worker holding the lock on this
+    # file runs the pipeline, all of them serve the web interface from the shared
+    # sqlite database
+    pipeline_lock_path: Path | None = None
+
+    @property
+    def all_conferences(self) -> list[str]:
+        return self.conferences or [self.conference]
+
+    @property
+    def default_conference(self) -> str:
+        """
+        The conference of events stored before there were several
+        """
+        return self.all_conferences[0]
 
 
 settings = Settings()
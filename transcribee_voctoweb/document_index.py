@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import time
+
+from transcribee_voctoweb.transcribee_api.client import TranscribeeApiClient
+from transcribee_voctoweb.transcribee_api.model import ApiDocumentWithTasks, TaskResponse
+
+
+class DocumentIndex:
+    """
+    All transcribee documents (with their tasks), fetched with a single request.
+    Concurrent refreshes share one request.
+    """
+
+    def __init__(self, client: TranscribeeApiClient):
+        self.client = client
+        self.documents: dict[str, ApiDocumentWithTasks] = {}
+        self.updated_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    def age(self) -> float:
+        if self.updated_at is None:
+            return float("inf")
+        return time.monotonic() - self.updated_at
+
+    async def refresh(self, max_age: float = 0):
+        async with self._lock:
+            # someone else might have refreshed while we waited for the lock
+            if self.age() <= max_age:
+                return
+
+            try:
+                documents = await self.client.list_documents()
+            except Exception:
+                self.documents = {}
+                self.updated_at = None
+                raise
+
+            self.documents = {doc.id: doc for doc in documents}
+            self.updated_at = time.monotonic()
+
+    async def get(self, doc_id: str, max_age: float) -> ApiDocumentWithTasks | None:
+        if self.age() > max_age:
+            try:
+                await self.refresh(max_age)
+            except Exception as exc:
+                logging.error("Could not list transcribee documents", exc_info=exc)
+        return self.documents.get(doc_id)
+
+    def tasks_by_document(self) -> dict[str, list[TaskResponse]]:
+        return {doc_id: doc.tasks for doc_id, doc in self.documents.items()}
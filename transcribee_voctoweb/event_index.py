@@ -0,0 +1,191 @@
+import base64
+import bisect
+from dataclasses import dataclass
+import json
+from typing import Any, Literal
+
+from transcribee_voctoweb.persistent_data import EventState, PersistentData, State
+from transcribee_voctoweb.voc_api.model import EventSummary
+
+SortKey = Literal["date", "title", "state"]
+
+STATE_ORDER = {state: i for i, state in enumerate(State)}
+
+
+@dataclass
+class EventRow:
+    guid: str
+    conference: str
+    title: str
+    date: str
+    state: State
+    failed: bool
+
+
+@dataclass
+class EventPage:
+    rows: list[EventRow]
+    # number of events matching the filter
+    total: int
+    counts: dict[str, int]
+    # number of events per conference
+    conferences: dict[str, int]
+    next_cursor: str | None
+
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode())))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def _sort_value(sort: SortKey, row: EventRow) -> Any:
+    if sort == "state":
+        return STATE_ORDER[row.state]
+    return getattr(row, sort)
+
+
+def _matches(row: EventRow, conference: str | None, state: State | None, failed: bool | None) -> bool:
+    return (
+        (conference is None or row.conference == conference)
+        and (state is None or row.state == state)
+        and (failed is None or row.failed == failed)
+    )
+
+
+class EventIndex:
+    """
+    The events of all conferences with their state, sorted and filtered for the
+    home page and the events api. The index is only rebuilt after `invalidate`,
+    i.e. when the conference listings changed. A state change (see `on_change`) updates its row and drops
+    the views it affects, and pages are found by bisecting, so a request costs the
+    same for 100 and for 10000 events.
+    """
+
+    def __init__(self, default_conference: str):
+        self.default_conference = default_conference
+        self._built = False
+        self._rows: dict[str, EventRow] = {}
+        self._counts: dict[str, int] = {}
+        self._conferences: dict[str, int] = {}
+        # (sort, conference, state, failed) -> ascending list of (sort value, guid)
+        self._views: dict[tuple, list[tuple]] = {}
+
+    def invalidate(self):
+        """
+        Rebuilds the index on the next query, called when the event listing changed
+        """
+        self._built = False
+
+    def _refresh(self, events: list[EventSummary], persistent_data: PersistentData):
+        if self._built:
+            return
+
+        default = EventState()
+        self._rows = {}
+        self._counts = {state.value: 0 for state in State}
+        self._counts["failed"] = 0
+        self._conferences = {}
+        for event in events:
+            event_state = persistent_data.event_states.get(event.guid, default)
+            row = EventRow(
+                guid=event.guid,
+                conference=event_state.conference or self.default_conference,
+                title=event.title,
+                date=event.date,
+                state=event_state.state,
+                failed=event_state.failed,
+            )
+            self._rows[event.guid] = row
+            self._count(row, 1)
+
+        self._views = {}
+        self._built = True
+
+    def _count(self, row: EventRow, delta: int):
+        self._counts[row.state.value] += delta
+        self._counts["failed"] += row.failed * delta
+        count = self._conferences.get(row.conference, 0) + delta
+        if count:
+            self._conferences[row.conference] = count
+        else:
+            self._conferences.pop(row.conference, None)
+
+    def on_change(self, guid: str, event_state: EventState, kind: str):
+        """
+        Listener of `PersistentData`. Most changes (e.g. the retry schedule) don't
+        touch what is indexed and cost nothing.
+        """
+        row = self._rows.get(guid)
+        if kind != "state" or row is None:
+            return
+
+        conference = event_state.conference or self.default_conference
+        if (row.state, row.failed, row.conference) == (event_state.state, event_state.failed, conference):
+            return
+
+        old = EventRow(**vars(row))
+        self._count(row, -1)
+        row.state, row.failed, row.conference = event_state.state, event_state.failed, conference
+        self._count(row, 1)
+
+        for key in list(self._views):
+            sort, *filters = key
+            was_in, is_in = _matches(old, *filters), _matches(row, *filters)
+            if was_in != is_in or (sort == "state" and is_in):
+                del self._views[key]
+
+    def _view(
+        self, sort: SortKey, conference: str | None, state: State | None, failed: bool | None
+    ) -> list[tuple]:
+        key = (sort, conference, state, failed)
+        view = self._views.get(key)
+        if view is None:
+            view = sorted(
+                (_sort_value(sort, row), row.guid)
+                for row in self._rows.values()
+                if _matches(row, conference, state, failed)
+            )
+            self._views[key] = view
+        return view
+
+    def query(
+        self,
+        events: list[EventSummary],
+        persistent_data: PersistentData,
+        sort: SortKey = "date",
+        descending: bool = False,
+        conference: str | None = None,
+        state: State | None = None,
+        failed: bool | None = None,
+        cursor: str | None = None,
+        limit: int = 50,
+    ) -> EventPage:
+        self._refresh(events, persistent_data)
+        view = self._view(sort, conference, state, failed)
+
+        try:
+            if descending:
+                end = len(view) if cursor is None else bisect.bisect_left(view, decode_cursor(cursor))
+                keys = view[max(0, end - limit) : end][::-1]
+                has_more = end - limit > 0
+            else:
+                start = 0 if cursor is None else bisect.bisect_right(view, decode_cursor(cursor))
+                keys = view[start : start + limit]
+                has_more = start + limit < len(view)
+        except TypeError:
+            # a cursor of a different sort order
+            raise ValueError("Invalid cursor")
+
+        return EventPage(
+            rows=[self._rows[guid] for _, guid in keys],
+            total=len(view),
+            counts=self._counts,
+            conferences=self._conferences,
+            next_cursor=encode_cursor(keys[-1]) if keys and has_more else None,
+        )
@@ -0,0 +1,105 @@
+from collections import OrderedDict
+import logging
+from pathlib import Path
+
+from pydantic import BaseModel
+
+
+class CachedExport(BaseModel):
+    changed_at: str
+    raw_vtt: str
+    formatted_vtt: str
+
+    def size(self):
+        return len(self.raw_vtt) + len(self.formatted_vtt)
+
+
+class ExportCache:
+    """
+    Raw and formatted VTT exports per transcribee document. An entry is only valid
+    as long as the document's changed_at did not move. Entries are kept in memory
+    up to `max_memory_bytes`. With a `directory`, they are also written to disk
+    (up to `max_disk_bytes`), which survives restarts and catches memory evictions.
+    Both tiers evict the least recently used entries first.
+    """
+
+    def __init__(self, max_memory_bytes: int, directory: Path | None = None, max_disk_bytes: int = 0):
+        self.max_memory_bytes = max_memory_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, CachedExport] = OrderedDict()
+        self._memory_bytes = 0
+
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get(self, doc_id: str, changed_at: str) -> CachedExport | None:
+        entry = self._memory.get(doc_id)
+        if entry is None:
+            entry = self._read_disk(doc_id)
+            if entry is not None:
+                self._put_memory(doc_id, entry)
+
+        if entry is None or entry.changed_at != changed_at:
+            self.misses += 1
+            return None
+
+        self._memory.move_to_end(doc_id)
+        self.hits += 1
+        return entry
+
+    def put(self, doc_id: str, changed_at: str, raw_vtt: str, formatted_vtt: str):
+        entry = CachedExport(changed_at=changed_at, raw_vtt=raw_vtt, formatted_vtt=formatted_vtt)
+        self._put_memory(doc_id, entry)
+        self._write_disk(doc_id, entry)
+
+    def _put_memory(self, doc_id: str, entry: CachedExport):
+        old = self._memory.pop(doc_id, None)
+        if old is not None:
+            self._memory_bytes -= old.size()
+
+        self._memory[doc_id] = entry
+        self._memory_bytes += entry.size()
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.size()
+
+    def _disk_path(self, doc_id: str) -> Path:
+        assert self.directory is not None
+        return self.directory / f"{doc_id}.json"
+
+    def _read_disk(self, doc_id: str) -> CachedExport | None:
+        if self.directory is None:
+            return None
+
+        path = self._disk_path(doc_id)
+        try:
+            entry = CachedExport.model_validate_json(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+        # mark as recently used for the disk eviction
+        path.touch()
+        return entry
+
+    def _write_disk(self, doc_id: str, entry: CachedExport):
+        if self.directory is None:
+            return
+
+        try:
+            self._disk_path(doc_id).write_text(entry.model_dump_json())
+            self._evict_disk()
+        except OSError as exc:
+            logging.warning("Could not write export cache entry", exc_info=exc)
+
+    def _evict_disk(self):
+        assert self.directory is not None
+        files = [(path, path.stat()) for path in self.directory.glob("*.json")]
+        total = sum(stat.st_size for _, stat in files)
+        for path, stat in sorted(files, key=lambda file: file[1].st_mtime):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
@@ -0,0 +1,93 @@
+import asyncio
+from enum import Enum
+import time
+
+import httpx
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request while the upstream is considered down
+    """
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"{upstream} is unavailable, retrying in {retry_after:.0f} s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+def is_outage(exc: BaseException) -> bool:
+    """
+    Whether an error says that the upstream is down or overloaded, rather than
+    that something is wrong with the request
+    """
+    if isinstance(exc, (httpx.TransportError, CircuitOpenError)):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status == httpx.codes.TOO_MANY_REQUESTS
+    return False
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to an upstream after `failure_threshold` outage errors
+    in a row. After `reset_timeout` seconds a single probe request is let through:
+    if it succeeds the breaker closes again, otherwise it stays open for another
+    `reset_timeout`. Used as `async with breaker:` around every request.
+    """
+
+    def __init__(self, upstream: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.upstream = upstream
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def retry_after(self) -> float:
+        return max(self._opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def _before_call(self):
+        if self.state == BreakerState.OPEN:
+            if self.retry_after() > 0:
+                raise CircuitOpenError(self.upstream, self.retry_after())
+            self.state = BreakerState.HALF_OPEN
+
+        if self.state == BreakerState.HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenError(self.upstream, self.reset_timeout)
+            self._probing = True
+
+    def _record(self, exc: BaseException | None):
+        if self.state == BreakerState.HALF_OPEN:
+            self._probing = False
+
+        if exc is None or not is_outage(exc):
+            self.state = BreakerState.CLOSED
+            self.failures = 0
+            return
+
+        self.failures += 1
+        if self.state == BreakerState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = BreakerState.OPEN
+            self._opened_at = time.monotonic()
+
+    async def __aenter__(self):
+        self._before_call()
+        return self
+
+    async def __aexit__(self, exc_type, exc: BaseException | None, traceback):
+        if isinstance(exc, asyncio.CancelledError):
+            # says nothing about the upstream, let the next request probe
+            self._probing = False
+        else:
+            self._record(exc)
+        return False
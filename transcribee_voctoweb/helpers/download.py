@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+
+from pydantic import BaseModel
+import httpx
+
+from transcribee_voctoweb.metrics import TRANSFER_BYTES
+
+# progress is written to disk at most once per this many bytes and segment
+PROGRESS_SAVE_INTERVAL = 8 * 1024 * 1024
+
+
+class DownloadError(Exception):
+    pass
+
+
+class Segment(BaseModel):
+    start: int
+    # inclusive, None if the total size is unknown
+    end: int | None
+    done: int = 0
+
+    @property
+    def finished(self):
+        return self.end is not None and self.start + self.done > self.end
+
+
+class DownloadProgress(BaseModel):
+    url: str
+    size: int | None
+    segments: list[Segment]
+    complete: bool = False
+
+
+def _progress_path(dest: Path):
+    return dest.with_name(dest.name + ".progress")
+
+
+def _save_progress(dest: Path, progress: DownloadProgress):
+    path = _progress_path(dest)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(progress.model_dump_json())
+    os.replace(tmp_path, path)
+
+
+def _load_progress(dest: Path, url: str) -> DownloadProgress | None:
+    path = _progress_path(dest)
+    if not path.exists() or not dest.exists():
+        return None
+
+    try:
+        progress = DownloadProgress.model_validate_json(path.read_text())
+    except ValueError:
+        return None
+
+    return progress if progress.url == url else None
+
+
+def discard_download(dest: Path):
+    dest.unlink(missing_ok=True)
+    _progress_path(dest).unlink(missing_ok=True)
+
+
+async def _probe(client: httpx.AsyncClient, url: str) -> tuple[int | None, bool]:
+    res = await client.head(url, follow_redirects=True)
+    res.raise_for_status()
+    length = res.headers.get("content-length")
+    accepts_ranges = res.headers.get("accept-ranges", "").lower() == "bytes"
+    return (int(length) if length is not None else None), accepts_ranges
+
+
+def _plan(url: str, size: int | None, accepts_ranges: bool, segments: int, min_segment_size: int):
+    if size is None or not accepts_ranges:
+        end = None if size is None else size - 1
+        return DownloadProgress(url=url, size=size, segments=[Segment(start=0, end=end)])
+
+    count = max(1, min(segments, size // min_segment_size))
+    segment_size = size // count
+    return DownloadProgress(
+        url=url,
+        size=size,
+        segments=[
+            Segment(
+                start=i * segment_size,
+                end=size - 1 if i == count - 1 else (i + 1) * segment_size - 1,
+            )
+            for i in range(count)
+        ],
+    )
+
+
+async def _download_segment(
+    client: httpx.AsyncClient, dest: Path, progress: DownloadProgress, segment: Segment
+):
+    headers = {}
+    if segment.start + segment.done > 0 or len(progress.segments) > 1:
+        end = "" if segment.end is None else str(segment.end)
+        headers["Range"] = f"bytes={segment.start + segment.done}-{end}"
+
+    async with client.stream("GET", progress.url, headers=headers, follow_redirects=True) as res:
+        res.raise_for_status()
+
+        if "Range" in headers and res.status_code != httpx.codes.PARTIAL_CONTENT:
+            if len(progress.segments) > 1:
+                raise DownloadError("Server stopped supporting range requests")
+            # the server ignored the range, start over
+            logging.info(f"{progress.url} does not support resuming, restarting download")
+            segment.done = 0
+
+        with open(dest, "r+b") as file:
+            file.seek(segment.start + segment.done)
+            unsaved = 0
+            async for chunk in res.aiter_bytes():
+                if segment.end is not None:
+                    chunk = chunk[: segment.end + 1 - segment.start - segment.done]
+                file.write(chunk)
+                TRANSFER_BYTES.labels("download").inc(len(chunk))
+                segment.done += len(chunk)
+                unsaved += len(chunk)
+                if unsaved >= PROGRESS_SAVE_INTERVAL:
+                    file.flush()
+                    _save_progress(dest, progress)
+                    unsaved = 0
+                if segment.finished:
+                    break
+
+            if segment.end is None:
+                # unknown size, everything the server sent is the file
+                file.truncate(segment.start + segment.done)
+                segment.end = segment.start + segment.done - 1
+            file.flush()
+            _save_progress(dest, progress)
+
+
+async def download_recording(
+    client: httpx.AsyncClient,
+    url: str,
+    dest: Path,
+    expected_size_mb: int | None = None,
+    segments: int = 1,
+    min_segment_size: int = 64 * 1024 * 1024,
+) -> Path:
+    """
+    Downloads `url` to `dest`. Progress is recorded next to `dest`, so a failed or
+    interrupted download is resumed with range requests on the next call. Large
+    files are fetched as multiple parallel byte ranges.
+    Call `discard_download` once the file is not needed anymore.
+    """
+    progress = _load_progress(dest, url)
+    if progress is not None and progress.complete:
+        return dest
+
+    if progress is None:
+        size, accepts_ranges = await _probe(client, url)
+        progress = _plan(url, size, accepts_ranges, segments, min_segment_size)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with open(dest, "wb") as file:
+            if size is not None:
+                file.truncate(size)
+        _save_progress(dest, progress)
+    else:
+        done = sum(segment.done for segment in progress.segments)
+        logging.info(f"Resuming download of {url} at {done} bytes")
+
+    tasks = [
+        asyncio.create_task(_download_segment(client, dest, progress, segment))
+        for segment in progress.segments
+        if not segment.finished
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # if one segment failed, stop the others before recording the progress
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        _save_progress(dest, progress)
+
+    actual_size = sum(segment.done for segment in progress.segments)
+    if progress.size is not None and actual_size != progress.size:
+        discard_download(dest)
+        raise DownloadError(f"Downloaded {actual_size} bytes, expected {progress.size}")
+
+    # voctoweb reports recording sizes in rounded megabytes
+    if expected_size_mb is not None and not any(
+        abs(actual_size / unit - expected_size_mb) <= 1 for unit in (1000**2, 1024**2)
+    ):
+        discard_download(dest)
+        raise DownloadError(
+            f"Downloaded {actual_size} bytes, but voctoweb reports {expected_size_mb} MB"
+        )
+
+    progress.complete = True
+    _save_progress(dest, progress)
+    return dest
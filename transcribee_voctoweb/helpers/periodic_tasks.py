@@ -1,14 +1,18 @@
 import asyncio
 import logging
+import time
 from typing import Callable
 
 from starlette.concurrency import run_in_threadpool
 
+from transcribee_voctoweb.metrics import observe_tick
+
 
 async def run_periodic(func: Callable, seconds: int):
     is_coroutine = asyncio.iscoroutinefunction(func)
 
     while True:
+        start = time.perf_counter()
         try:
             if is_coroutine:
                 await func()
@@ -16,4 +20,5 @@ async def run_periodic(func: Callable, seconds: int):
                 await run_in_threadpool(func)
         except Exception as exc:
             logging.error("Repeating task failed", exc_info=exc)
+        observe_tick(func.__name__, time.perf_counter() - start, seconds)
         await asyncio.sleep(seconds)
@@ -0,0 +1,63 @@
+import datetime
+import email.utils
+import random
+
+import httpx
+
+# statuses whose Retry-After header tells when to try again
+RETRY_AFTER_STATUSES = {httpx.codes.TOO_MANY_REQUESTS, httpx.codes.SERVICE_UNAVAILABLE}
+
+
+class RetryLaterError(httpx.HTTPStatusError):
+    """
+    An upstream asked us to come back after `retry_after` seconds
+    """
+
+    def __init__(self, message: str, *, request: httpx.Request, response: httpx.Response, retry_after: float):
+        super().__init__(message, request=request, response=response)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str) -> float | None:
+    """
+    Seconds until the time given by a Retry-After header, either in seconds or as
+    an http date
+    """
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return max((date - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+
+
+def raise_for_status(response: httpx.Response):
+    """
+    Like `response.raise_for_status()`, but raises a `RetryLaterError` for 429 and
+    503 responses with a valid Retry-After header
+    """
+    if response.status_code in RETRY_AFTER_STATUSES:
+        retry_after = parse_retry_after(response.headers.get("retry-after", ""))
+        if retry_after is not None:
+            raise RetryLaterError(
+                f"{response.status_code} for {response.request.url}, retry after {retry_after:.0f} s",
+                request=response.request,
+                response=response,
+                retry_after=retry_after,
+            )
+    response.raise_for_status()
+
+
+def backoff_delay(exponent: int, base: float, maximum: float) -> float:
+    """
+    Exponential backoff with jitter: between half and all of `base * 2 ** exponent`,
+    capped at `maximum`, so events failing together don't retry together
+    """
+    delay = min(base * 2 ** min(exponent, 32), maximum)
+    return random.uniform(delay / 2, delay)
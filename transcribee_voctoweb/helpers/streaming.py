@@ -0,0 +1,33 @@
+import asyncio
+from typing import AsyncIterator
+
+
+async def buffered(source: AsyncIterator[bytes], max_chunks: int) -> AsyncIterator[bytes]:
+    """
+    Reads `source` in a background task into a queue of at most `max_chunks` chunks.
+    This lets the producer (e.g. a download) run ahead of the consumer (e.g. an upload)
+    while keeping memory usage bounded.
+    """
+    queue: asyncio.Queue[bytes | BaseException | None] = asyncio.Queue(maxsize=max_chunks)
+
+    async def pump():
+        try:
+            async for chunk in source:
+                await queue.put(chunk)
+        except Exception as exc:
+            await queue.put(exc)
+        else:
+            await queue.put(None)
+
+    pump_task = asyncio.create_task(pump())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        pump_task.cancel()
+        await asyncio.gather(pump_task, return_exceptions=True)
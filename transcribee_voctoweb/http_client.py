@@ -0,0 +1,50 @@
+import importlib.util
+import logging
+
+import httpx
+
+from transcribee_voctoweb.config import Settings
+from transcribee_voctoweb.metrics import InstrumentedTransport, upstream_hosts
+
+
+def create_http_client(settings: Settings) -> httpx.AsyncClient:
+    """
+    The connection pool shared by both api clients and the recording downloads
+    """
+    http2 = settings.http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logging.warning("HTTP/2 requested, but the h2 package is not installed. Using HTTP/1.1")
+        http2 = False
+
+    transport = httpx.AsyncHTTPTransport(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+    )
+    upstreams = upstream_hosts({
+        "transcribee": settings.transcribee_api_url,
+        "voctoweb": settings.voc_api_url,
+    })
+    return httpx.AsyncClient(timeout=10.0, transport=InstrumentedTransport(transport, upstreams))
+
+
+def pool_stats(client: httpx.AsyncClient) -> dict[str, int]:
+    # httpx does not expose pool usage, so this peeks into the httpcore pool
+    transport = client._transport
+    if isinstance(transport, InstrumentedTransport):
+        transport = transport.transport
+    pool = getattr(transport, "_pool", None)
+    if pool is None:
+        return {}
+
+    connections = pool.connections
+    requests = getattr(pool, "_requests", [])
+    return {
+        "connections": len(connections),
+        "idle_connections": sum(1 for connection in connections if connection.is_idle()),
+        "active_requests": sum(1 for request in requests if not request.is_queued()),
+        "queued_requests": sum(1 for request in requests if request.is_queued()),
+    }
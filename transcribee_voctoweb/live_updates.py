@@ -0,0 +1,79 @@
+import asyncio
+import json
+from typing import AsyncIterator, Mapping
+
+from transcribee_voctoweb.persistent_data import EventState
+
+# seconds between keepalive comments on idle streams
+KEEPALIVE_INTERVAL = 15
+
+
+class _Subscriber:
+    def __init__(self, guid: str | None, max_queue: int):
+        self.guid = guid
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_queue)
+        self.dropped = False
+
+
+class LiveUpdates:
+    """
+    Fans out event state transitions and new log entries to server-sent event
+    streams. State changes go to all streams, log entries only to the streams of
+    their event. A stream that can't keep up is closed, browsers reconnect on
+    their own.
+    """
+
+    def __init__(self, event_states: Mapping[str, EventState], max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._subscribers: set[_Subscriber] = set()
+        # so the first change of an event after the start has a previous state, too
+        self._last_state: dict[str, tuple[str, bool]] = {
+            guid: (event_state.state.value, event_state.failed) for guid, event_state in event_states.items()
+        }
+
+    def on_change(self, guid: str, event_state: EventState, kind: str):
+        previous = None
+        if kind == "state":
+            state = (event_state.state.value, event_state.failed)
+            previous = self._last_state.get(guid)
+            # most field changes (e.g. try_count) don't change what is shown
+            if previous == state:
+                return
+            self._last_state[guid] = state
+
+        if not self._subscribers:
+            return
+
+        if kind == "state":
+            data = {"guid": guid, "state": event_state.state.value, "failed": event_state.failed}
+            if previous is not None:
+                # lets the home page keep its counts per state up to date
+                data["previous_state"], data["previous_failed"] = previous
+        else:
+            data = {"guid": guid, **event_state.log[-1].model_dump(mode="json")}
+        self._publish(guid, f"event: {kind}\ndata: {json.dumps(data)}\n\n", to_all=kind == "state")
+
+    def _publish(self, guid: str, message: str, to_all: bool):
+        for subscriber in list(self._subscribers):
+            if subscriber.guid != guid and not (to_all and subscriber.guid is None):
+                continue
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                subscriber.dropped = True
+                self._subscribers.discard(subscriber)
+
+    async def stream(self, guid: str | None = None) -> AsyncIterator[str]:
+        """
+        Server-sent events for one event (`guid`) or the state changes of all events
+        """
+        subscriber = _Subscriber(guid, self.max_queue)
+        self._subscribers.add(subscriber)
+        try:
+            while not subscriber.dropped:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), timeout=KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            self._subscribers.discard(subscriber)
@@ -1,33 +1,68 @@
 import asyncio
 from contextlib import asynccontextmanager
 import datetime
+import hashlib
 import logging
-from pathlib import Path
-import tempfile
+import time
 import traceback
-from typing import IO
+from typing import Awaitable, Callable
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.security import HTTPBasic
-import httpx
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import RedirectResponse
 
+from transcribee_voctoweb import metrics
+from transcribee_voctoweb.backpressure import Backpressure, queued_cost
 from transcribee_voctoweb.subtitle_formatting import format_subtitle_vtt
+from transcribee_voctoweb.conference_diff import diff_events
 from transcribee_voctoweb.config import settings
+from transcribee_voctoweb.document_index import DocumentIndex
+from transcribee_voctoweb.event_index import EventIndex, EventPage, SortKey
+from transcribee_voctoweb.export_cache import CachedExport, ExportCache
+from transcribee_voctoweb.http_client import create_http_client, pool_stats
+from transcribee_voctoweb.helpers.download import discard_download, download_recording
+from transcribee_voctoweb.helpers.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    is_outage,
+)
 from transcribee_voctoweb.helpers.periodic_tasks import run_periodic
-from transcribee_voctoweb.persistent_data import EventState, PersistentData, State
+from transcribee_voctoweb.helpers.retry import RetryLaterError, backoff_delay
+from transcribee_voctoweb.helpers.streaming import buffered
+from transcribee_voctoweb.live_updates import LiveUpdates
+from transcribee_voctoweb.persistent_data import (
+    REPUBLISHABLE_STATES,
+    EventState,
+    PersistentData,
+    State,
+)
+from transcribee_voctoweb.poll_planner import PollPlanner, estimate_etas
+from transcribee_voctoweb.scheduler import Scheduler
+from transcribee_voctoweb.storage import create_storage
+from transcribee_voctoweb.submission_priority import SubmissionPriority, interleave
 from transcribee_voctoweb.transcribee_api.client import (
     DocumentBodyWithFile,
+    DocumentBodyWithStream,
     TranscribeeApiClient,
 )
-from transcribee_voctoweb.transcribee_api.model import CreateShareToken, TaskResponse, TaskState, TaskTypeModel
+from transcribee_voctoweb.transcribee_api.model import (
+    CreateShareToken,
+    TaskQueueInfoResponse,
+    TaskResponse,
+    TaskState,
+    TaskTypeModel,
+)
 import urllib.parse
 
 from transcribee_voctoweb.voc_api.client import VocPublishingApiClient
+from transcribee_voctoweb.voc_api.model import DetailedEvent, Recording
+from transcribee_voctoweb.workers import CommandQueue, PipelineLock
 
 logging.basicConfig(level=logging.DEBUG)
 logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -35,35 +70,154 @@ logging.getLogger("httpcore").setLevel(logging.WARNING)
 
 security = HTTPBasic()
 
+STREAM_CHUNK_SIZE = 64 * 1024
+# seconds a queue info fetched for polling is reused for the backpressure
+QUEUE_INFO_MAX_AGE = 10
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # startup
+    global storage
+    storage = create_storage(
+        settings.storage_backend,
+        data_path=settings.data_path,
+        database_path=settings.database_path,
+    )
+    import_path = settings.data_path if settings.storage_backend != "json" else None
     global persistent_data
-    data_path = Path("data.json")
-    persistent_data = PersistentData.load_json(data_path)
+    persistent_data = PersistentData.load(storage, import_path=import_path)
+
+    global live_updates
+    live_updates = LiveUpdates(persistent_data.event_states)
+    persistent_data.add_listener(live_updates.on_change)
+
+    global http_client
+    http_client = create_http_client(settings)
 
     global transcribee_api
     transcribee_api = TranscribeeApiClient(
-        base_url=settings.transcribee_api_url, token=settings.transcribee_pat
+        base_url=settings.transcribee_api_url,
+        token=settings.transcribee_pat,
+        api_token=settings.transcribee_api_token,
+        client=http_client,
+        breaker=CircuitBreaker(
+            "transcribee",
+            failure_threshold=settings.breaker_failure_threshold,
+            reset_timeout=settings.breaker_reset_timeout,
+        ),
     )
 
     global voc_api
     voc_api = VocPublishingApiClient(
         base_url=settings.voc_api_url,
         token=settings.voc_token,
+        event_cache_size=settings.event_cache_size,
+        event_cache_ttl=settings.event_cache_ttl,
+        client=http_client,
+        breaker=CircuitBreaker(
+            "voctoweb",
+            failure_threshold=settings.breaker_failure_threshold,
+            reset_timeout=settings.breaker_reset_timeout,
+        ),
     )
 
-    def continous_save():
-        persistent_data.save_json(data_path, only_if_changed=True)
+    global events, conference_events
+    # the events of all conferences, rebuilt when one of them changed
+    events = []
+    conference_events = {}
 
-    asyncio.create_task(run_periodic(continous_save, seconds=1))
+    global event_index
+    event_index = EventIndex(settings.default_conference)
+    persistent_data.add_listener(event_index.on_change)
+
+    global document_index
+    document_index = DocumentIndex(transcribee_api)
+
+    global export_cache, uploads_requested_at
+    export_cache = ExportCache(
+        max_memory_bytes=settings.export_cache_memory_bytes,
+        directory=settings.export_cache_dir,
+        max_disk_bytes=settings.export_cache_disk_bytes,
+    )
+    # monotonic time of the last manual upload, see `export_transcribee_document_to_voc`
+    uploads_requested_at = None
+
+    global poll_planner
+    poll_planner = PollPlanner(
+        min_interval=settings.poll_min_interval,
+        max_interval=settings.poll_max_interval,
+        eta_factor=settings.poll_eta_factor,
+    )
+
+    global submission_priority
+    submission_priority = SubmissionPriority()
+
+    global backpressure, latest_queue_info
+    backpressure = Backpressure(
+        max_in_flight=settings.max_in_flight_documents,
+        max_queued_cost=settings.max_queued_cost,
+    )
+    latest_queue_info = None
+
+    global scheduler
+    scheduler = Scheduler(weights=settings.conference_weights)
+    scheduler.add_stage(
+        "submit",
+        stage_handler(submit),
+        concurrency=settings.submit_concurrency,
+        queue_depth=settings.scheduler_queue_depth,
+    )
+    scheduler.add_stage(
+        "poll",
+        stage_handler(poll),
+        concurrency=settings.poll_concurrency,
+        queue_depth=settings.scheduler_queue_depth,
+    )
+    scheduler.add_stage(
+        "export",
+        stage_handler(export),
+        concurrency=settings.export_concurrency,
+        queue_depth=settings.scheduler_queue_depth,
+    )
+    scheduler.add_stage(
+        "republish",
+        stage_handler(republish),
+        concurrency=settings.export_concurrency,
+        queue_depth=settings.scheduler_queue_depth,
+    )
+
+    global pipeline_running, pipeline_lock, commands
+    pipeline_running = False
+    pipeline_lock = None
+    commands = None
+
+    # every worker needs the conference listing for the web interface
     asyncio.create_task(run_periodic(update_conference, seconds=60))
-    asyncio.create_task(run_periodic(process_events, seconds=10))
+
+    # also brings the uploads of the republish cli into the event states
+    if settings.storage_backend == "sqlite":
+        commands = CommandQueue(settings.database_path)
+
+    if settings.pipeline_lock_path is None:
+        start_pipeline()
+    else:
+        if not storage.shareable:
+            raise ValueError("Running several workers needs the sqlite storage backend")
+        pipeline_lock = PipelineLock(settings.pipeline_lock_path)
+        asyncio.create_task(run_periodic(coordinate_workers, seconds=1))
 
     yield
 
     # shutdown
-    persistent_data.save_json(data_path)
+    if pipeline_running:
+        await scheduler.stop()
+        persistent_data.save(storage)
+    storage.close()
+    if commands is not None:
+        commands.close()
+    if pipeline_lock is not None:
+        pipeline_lock.release()
+    await http_client.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -85,6 +239,130 @@ def format_state(value: State):
 templates.env.filters["format_state"] = format_state
 
 
+def start_pipeline():
+    global pipeline_running
+    pipeline_running = True
+
+    add_missing_event_states()
+    scheduler.start()
+    asyncio.create_task(run_periodic(continous_save, seconds=1))
+    asyncio.create_task(run_periodic(process_events, seconds=10))
+    if commands is not None:
+        asyncio.create_task(run_periodic(run_commands, seconds=1))
+
+
+async def run_commands():
+    assert commands is not None
+    # only the query runs in a thread, actions change event states and the scheduler
+    for command in await run_in_threadpool(commands.pop_all):
+        run_action(command.action, command.event_id, command.payload)
+
+
+def continous_save():
+    start = time.perf_counter()
+    written = persistent_data.save(storage)
+    if written:
+        metrics.SAVE_DURATION.observe(time.perf_counter() - start)
+        metrics.SAVE_BYTES.inc(written)
+
+
+async def coordinate_workers():
+    """
+    With several workers, the one holding the pipeline lock runs the pipeline and
+    the manual actions of all workers. The others follow its saves.
+    """
+    if pipeline_running:
+        return
+
+    assert pipeline_lock is not None
+    acquired = pipeline_lock.try_acquire()
+    # after acquiring, this also picks up the last saves of the previous owner
+    persistent_data.refresh(storage)
+    if acquired:
+        logging.info("This worker runs the pipeline now")
+        start_pipeline()
+
+
+def finish_transcript_action(event_id: str):
+    if event_id not in persistent_data.event_states:
+        persistent_data.add_event_state(event_id)
+
+    persistent_data.event_states[event_id].transcription_finished = True
+
+
+def mark_corrected_action(event_id: str):
+    persistent_data.event_states[event_id].switch_state(State.DONE)
+
+
+def reset_failed_action(event_id: str):
+    event_state = persistent_data.event_states[event_id]
+    event_state.failed = False
+    event_state.try_count = 0
+    event_state.next_attempt_at = None
+    event_state.backoff_exponent = 0
+    event_state.add_log("Reset failed state")
+
+
+def bump_action(event_id: str):
+    event_state = persistent_data.event_states[event_id]
+    event_state.bumped = True
+    event_state.add_log("Bumped submission priority")
+
+
+def upload_to_voc_action(event_id: str):
+    request_uploads()
+    scheduler.schedule("republish", event_id, conference_of(persistent_data.event_states[event_id]))
+
+
+def record_upload_action(event_id: str, vtt_hash: str, language: str):
+    event_state = persistent_data.event_states[event_id]
+    event_state.published_vtt_hash = vtt_hash
+    event_state.published_vtt_language = language
+    event_state.add_log("Uploaded subtitles to voc (republish cli)")
+
+
+def republish_changed_action(_: None):
+    request_uploads()
+    for event_id, event_state in persistent_data.event_states.items():
+        if event_state.state in REPUBLISHABLE_STATES and event_state.transcribee_doc is not None:
+            scheduler.schedule("republish", event_id, conference_of(event_state))
+
+
+def request_uploads():
+    global uploads_requested_at
+    uploads_requested_at = time.monotonic()
+
+
+ACTIONS: dict[str, Callable] = {
+    "finish_transcript": finish_transcript_action,
+    "mark_corrected": mark_corrected_action,
+    "reset_failed": reset_failed_action,
+    "bump": bump_action,
+    "upload_to_voc": upload_to_voc_action,
+    "republish_changed": republish_changed_action,
+    "record_upload": record_upload_action,
+}
+
+
+def run_action(action: str, event_id: str | None, payload: dict | None = None):
+    try:
+        ACTIONS[action](event_id, **(payload or {}))
+    except Exception as exc:
+        logging.error(f"Action {action} for {event_id} failed", exc_info=exc)
+
+
+def dispatch(action: str, event_id: str | None = None):
+    """
+    Event states are only changed by the process running the pipeline, other
+    workers hand manual actions over to it.
+    """
+    if pipeline_running:
+        run_action(action, event_id)
+    else:
+        assert commands is not None
+        commands.push(action, event_id)
+
+
 class IllegalEventStateError(ValueError):
     def __init__(self, state: EventState, reason: str):
         super().__init__("Illegal event state")
@@ -96,104 +374,373 @@ class RecoverableDependencyError(ValueError):
 
 
 async def process_events():
+    # documents whose transcription status should be checked in this tick
+    due_docs = {
+        state.transcribee_doc
+        for event in events
+        if (state := persistent_data.event_states[event.guid]).state == State.TRANSCRIBING
+        and not state.failed
+        and state.transcribee_doc is not None
+        and not scheduler.is_pending(event.guid)
+        and poll_planner.is_due(state.transcribee_doc)
+    }
+    if due_docs:
+        await plan_polls(due_docs)
+
+    now = time.time()
+    new_events = []
+    in_flight = 0
+    for event in events:
+        state = persistent_data.event_states[event.guid]
+
+        if state.failed:
+            continue
+
+        if state.state == State.TRANSCRIBING:
+            in_flight += 1
+
+        # backing off after an error
+        if state.next_attempt_at is not None and state.next_attempt_at > now:
+            continue
+
+        if state.state == State.NEW:
+            if not scheduler.is_pending(event.guid):
+                new_events.append(event.guid)
+            continue
+
+        if (
+            state.state == State.TRANSCRIBING
+            and state.transcribee_doc is not None
+            and state.transcribee_doc not in due_docs
+        ):
+            continue
+
+        # events in all other states only wait for manual actions
+        stage = STAGE_FOR_STATE.get(state.state)
+        if stage is not None:
+            scheduler.schedule(stage, event.guid, conference_of(state))
+
+    if new_events:
+        await schedule_submissions(new_events, in_flight)
+
+
+async def schedule_submissions(new_events: list[str], in_flight: int):
+    """
+    Keeps the `submit_top_n` new events with the highest priority queued for
+    submission, so valuable talks reach the transcribee workers first. The slots
+    are shared between conferences by `conference_weights`. Holds them back
+    while transcribee is busy.
+    """
+    submit_stats = scheduler.stats()["submit"]
+    submitting = submit_stats["queued"] + submit_stats["running"]
+    free = settings.submit_top_n - submitting
+
+    allowed = backpressure.allowed(submitting + in_flight, await get_queued_cost())
+    metrics.SUBMISSIONS_HELD.set(backpressure.held is not None)
+    if allowed is not None:
+        free = min(free, allowed)
+    if free <= 0:
+        return
+
+    unknown = [guid for guid in new_events if not submission_priority.is_known(guid)]
+    if unknown:
+        await fetch_priority_inputs(unknown)
+
+    # ranked per conference, so a large conference can't take all slots
+    by_conference: dict[str, list[str]] = {}
+    for guid in new_events:
+        by_conference.setdefault(conference_of(persistent_data.event_states[guid]), []).append(guid)
+    ranked = {
+        conference_id: submission_priority.rank(
+            guids, {guid for guid in guids if persistent_data.event_states[guid].bumped}
+        )
+        for conference_id, guids in by_conference.items()
+    }
+
+    for guid in interleave(ranked, settings.conference_weights, free):
+        scheduler.schedule("submit", guid, conference_of(persistent_data.event_states[guid]))
+
+
+async def get_queued_cost() -> float | None:
+    if backpressure.max_queued_cost is None or transcribee_api.api_token is None:
+        return None
+
+    if latest_queue_info is not None and time.monotonic() - latest_queue_info[0] <= QUEUE_INFO_MAX_AGE:
+        queue_info = latest_queue_info[1]
+    else:
+        try:
+            queue_info = await transcribee_api.get_queue_info()
+        except Exception as exc:
+            logging.error("Could not get transcribee queue info", exc_info=exc)
+            return None
+        set_queue_info(queue_info)
+
+    return queued_cost(queue_info)
+
+
+def set_queue_info(queue_info: TaskQueueInfoResponse):
+    global latest_queue_info
+    latest_queue_info = (time.monotonic(), queue_info)
+
+
+async def fetch_priority_inputs(guids: list[str]):
+    limit = asyncio.Semaphore(settings.poll_concurrency)
+
+    async def fetch(guid: str):
+        async with limit:
+            try:
+                details = await voc_api.get_event(conference_of(persistent_data.event_states[guid]), guid)
+            except Exception as exc:
+                # ranked last until the next tick
+                logging.warning(f"Could not get details of {guid} for its priority: {exc!r}")
+                return
+            submission_priority.update(guid, details)
+
     async with asyncio.TaskGroup() as tg:
-        for event in events:
-            state = persistent_data.event_states[event.guid]
+        for guid in guids:
+            tg.create_task(fetch(guid))
+
+
+async def plan_polls(due_docs: set[str]):
+    try:
+        await document_index.refresh()
+    except Exception as exc:
+        # polling falls back to requesting the tasks per document
+        logging.error("Could not list transcribee documents", exc_info=exc)
+
+    etas = {}
+    if transcribee_api.api_token is not None and document_index.documents:
+        try:
+            queue_info = await transcribee_api.get_queue_info()
+            set_queue_info(queue_info)
+            etas = estimate_etas(queue_info, document_index.tasks_by_document())
+        except Exception as exc:
+            logging.error("Could not get transcribee queue info", exc_info=exc)
+
+    for doc_id in due_docs:
+        # documents without open tasks are (almost) done, check them again soon
+        poll_planner.plan(doc_id, etas.get(doc_id))
 
-            if state.state != State.DONE and not state.failed:
-                tg.create_task(wrapped_process(event.guid, state))
 
+def stage_handler(step: Callable[[str, EventState], Awaitable[str | None]]):
+    async def handler(event_id: str):
+        return await wrapped_process(event_id, persistent_data.event_states[event_id], step)
 
-async def wrapped_process(event_id: str, event_state: EventState):
+    return handler
+
+
+async def wrapped_process(
+    event_id: str,
+    event_state: EventState,
+    step: Callable[[str, EventState], Awaitable[str | None]],
+):
     try:
-        await process(event_id, event_state)
+        next_stage = await step(event_id, event_state)
     except IllegalEventStateError:
         logging.error("Illegal event state")
         event_state.add_log("Illegal event state")
-        event_state.failed = True
+        mark_failed(event_id, event_state)
     except RecoverableDependencyError:
         logging.warn("Recoverable dependency error")
         event_state.add_log("Recoverable dependency error")
+        back_off(event_state, maximum=settings.missing_recording_max_delay)
+    except CircuitOpenError as e:
+        logging.warning(str(e))
+        event_state.add_log(str(e))
+        back_off(event_state, retry_after=e.retry_after)
+    except RetryLaterError as e:
+        logging.warning(str(e))
+        event_state.add_log(f"Upstream asked to retry later: {e}")
+        back_off(event_state, retry_after=e.retry_after)
     except Exception as e:
         logging.error("Unknown error", exc_info=e)
         event_state.add_log(f"Unknown error: {traceback.format_exc()}")
+        if is_outage(e):
+            # not the event's fault, an outage doesn't count against its tries
+            back_off(event_state)
+            return
         event_state.try_count += 1
         if event_state.try_count >= 3:
             logging.error("Failed after 3 tries")
-            event_state.failed = True
+            mark_failed(event_id, event_state)
             event_state.add_log("Failed after 3 tries")
+        else:
+            back_off(event_state)
+    else:
+        if event_state.next_attempt_at is not None or event_state.backoff_exponent:
+            event_state.next_attempt_at = None
+            event_state.backoff_exponent = 0
+        return next_stage
 
 
-async def process(event_id: str, event_state: EventState):
-    if event_state.state == State.NEW:
-        event_details = await voc_api.get_event(settings.conference, event_id)
-        mp4_recording = next(
-            (
-                recording
-                for recording in event_details.recordings
-                if recording.mime_type == "video/mp4"
-                and recording.high_quality is False
-            ),
-            None,
+def mark_failed(event_id: str, event_state: EventState):
+    event_state.failed = True
+    # a failed event is only retried after a reset, don't keep its recording until then
+    discard_download(settings.download_dir / f"{event_id}.mp4")
+
+
+def breakers() -> list[CircuitBreaker]:
+    return [voc_api.breaker, transcribee_api.breaker]
+
+
+def back_off(event_state: EventState, retry_after: float | None = None, maximum: float | None = None):
+    """
+    Skips the event in the next ticks, for exponentially longer after every error
+    """
+    if retry_after is None:
+        delay = backoff_delay(
+            event_state.backoff_exponent,
+            settings.retry_base_delay,
+            maximum if maximum is not None else settings.retry_max_delay,
         )
+    else:
+        delay = retry_after
+    event_state.backoff_exponent += 1
+    event_state.next_attempt_at = time.time() + delay
+
+
+async def submit(event_id: str, event_state: EventState):
+    if event_state.state != State.NEW:
+        return
+
+    event_details = await voc_api.get_event(conference_of(event_state), event_id)
+    submission_priority.update(event_id, event_details)
+    mp4_recording = next(
+        (
+            recording
+            for recording in event_details.recordings
+            if recording.mime_type == "video/mp4"
+            and recording.high_quality is False
+        ),
+        None,
+    )
 
-        if mp4_recording is None:
-            raise RecoverableDependencyError(event_state, "Event has no mp4 recording")
-
-        with tempfile.NamedTemporaryFile() as video_file:
-            logging.debug(f"Downloading {mp4_recording.recording_url}")
-            await download_file(mp4_recording.recording_url, video_file)
-            video_file.flush()
-            video_file.seek(0)
-
-            doc = await transcribee_api.create_document(
-                DocumentBodyWithFile(
-                    name=event_details.title,
-                    file=video_file,
-                    model="large-v3",
-                    language="auto",
-                    number_of_speakers=None,
-                ),
-            )
-            event_state.transcribee_doc = doc.id
-
-            share_token = await transcribee_api.create_share_token(
-                doc.id,
-                CreateShareToken(
-                    name="voctoweb-glue",
-                    can_write=True,
-                    valid_until=None,
+    if mp4_recording is None:
+        # the next attempt should see a newly published recording
+        voc_api.invalidate_event(conference_of(event_state), event_id)
+        raise RecoverableDependencyError(event_state, "Event has no mp4 recording")
+
+    doc = None
+    if settings.stream_recordings:
+        doc = await create_document_streaming(event_details, mp4_recording)
+    if doc is None:
+        doc = await create_document_downloaded(event_id, event_details, mp4_recording)
+
+    event_state.transcribee_doc = doc.id
+
+    share_token = await transcribee_api.create_share_token(
+        doc.id,
+        CreateShareToken(
+            name="voctoweb-glue",
+            can_write=True,
+            valid_until=None,
+        ),
+    )
+    event_state.transcribee_share_token = share_token.token
+    event_state.bumped = False
+    event_state.switch_state(State.TRANSCRIBING)
+    submission_priority.forget(event_id)
+
+
+async def create_document_streaming(event_details: DetailedEvent, recording: Recording):
+    """
+    Uploads the recording to transcribee while it is downloaded. Returns None if
+    voctoweb does not report its length, as the upload needs to know it upfront.
+    """
+    logging.debug(f"Streaming {recording.recording_url}")
+    async with open_recording(recording.recording_url) as res:
+        content_length = res.headers.get("content-length")
+        if content_length is None or "content-encoding" in res.headers:
+            return None
+
+        download = metrics.count_transfer(res.aiter_bytes(STREAM_CHUNK_SIZE), "download")
+        return await transcribee_api.create_document_from_stream(
+            DocumentBodyWithStream(
+                name=event_details.title,
+                file=metrics.count_transfer(
+                    buffered(download, max_chunks=settings.stream_buffer_chunks),
+                    "upload",
                 ),
-            )
-            event_state.transcribee_share_token = share_token.token
-            event_state.switch_state(State.TRANSCRIBING)
+                file_size=int(content_length),
+                model="large-v3",
+                language="auto",
+                number_of_speakers=None,
+            ),
+        )
+
+
+async def create_document_downloaded(event_id: str, event_details: DetailedEvent, recording: Recording):
+    logging.debug(f"Downloading {recording.recording_url}")
+    video_path = await download_recording(
+        http_client,
+        recording.recording_url,
+        settings.download_dir / f"{event_id}.mp4",
+        expected_size_mb=recording.size,
+        segments=settings.download_segments,
+        min_segment_size=settings.download_min_segment_size,
+    )
+
+    with open(video_path, "rb") as video_file:
+        doc = await transcribee_api.create_document(
+            DocumentBodyWithFile(
+                name=event_details.title,
+                file=video_file,
+                model="large-v3",
+                language="auto",
+                number_of_speakers=None,
+            ),
+        )
 
-    elif event_state.state == State.TRANSCRIBING:
-        if event_state.transcribee_doc is None:
-            raise IllegalEventStateError(event_state, "transcribee_doc is None")
+    metrics.TRANSFER_BYTES.labels("upload").inc(video_path.stat().st_size)
 
+    # only discard after the upload, a failed upload is retried without downloading again
+    discard_download(video_path)
+    return doc
+
+
+async def poll(event_id: str, event_state: EventState):
+    if event_state.state != State.TRANSCRIBING:
+        return
+
+    if event_state.transcribee_doc is None:
+        raise IllegalEventStateError(event_state, "transcribee_doc is None")
+
+    document = document_index.documents.get(event_state.transcribee_doc)
+    if document is not None:
+        tasks = document.tasks
+    else:
         logging.debug(f"Checking status of {event_state.transcribee_doc}")
         tasks = await transcribee_api.get_tasks_for_document(event_state.transcribee_doc)
 
-        if transcription_finished(tasks):
-            await export_transcribee_document_to_voc(event_id, event_state.transcribee_doc)
+    if transcription_finished(tasks):
+        return "export"
 
-            event_state.switch_state(State.NEEDS_CORRECTION)
-            logging.info(f"{event_id} just finished automatic transcription")
 
-    elif event_state.state == State.NEEDS_CORRECTION:
-        # only manual actions in this state
-        pass
+async def export(event_id: str, event_state: EventState):
+    if event_state.state != State.TRANSCRIBING:
+        return
 
-    elif event_state.state == State.CORRECTING:
-        # only manual actions in this state
-        pass
+    if event_state.transcribee_doc is None:
+        raise IllegalEventStateError(event_state, "transcribee_doc is None")
 
-    elif event_state.state == State.DONE:
-        pass
+    await export_transcribee_document_to_voc(event_id, event_state.transcribee_doc)
+    poll_planner.forget(event_state.transcribee_doc)
+
+    event_state.switch_state(State.NEEDS_CORRECTION)
+    logging.info(f"{event_id} just finished automatic transcription")
+
+
+async def republish(event_id: str, event_state: EventState):
+    if event_state.state not in REPUBLISHABLE_STATES or event_state.transcribee_doc is None:
+        return
+
+    await export_transcribee_document_to_voc(event_id, event_state.transcribee_doc)
 
-    else:
-        raise IllegalEventStateError(event_state, "unknown state")
+
+STAGE_FOR_STATE = {
+    State.NEW: "submit",
+    State.TRANSCRIBING: "poll",
+}
 
 
 def transcription_finished(tasks: list[TaskResponse]):
@@ -225,51 +772,220 @@ def transcription_finished(tasks: list[TaskResponse]):
     return True
 
 
+def conference_of(event_state: EventState) -> str:
+    return event_state.conference or settings.default_conference
+
+
 async def update_conference():
-    logging.debug("Updating conference...")
-    global conference
-    new_conference = await voc_api.get_conference(settings.conference)
-    new_conference.events = sorted(
-        new_conference.events, key=lambda event: event.date
-    )
+    changed = False
+    for conference_id in settings.all_conferences:
+        try:
+            changed |= await update_conference_events(conference_id)
+        except Exception as exc:
+            logging.error(f"Could not update conference {conference_id}", exc_info=exc)
+
+    if changed:
+        global events
+        events = [
+            event
+            for conference_id in settings.all_conferences
+            for event in conference_events.get(conference_id, [])
+        ]
+        event_index.invalidate()
+        if pipeline_running:
+            add_missing_event_states()
+
+
+async def update_conference_events(conference_id: str) -> bool:
+    logging.debug(f"Updating conference {conference_id}...")
+    new_conference = await voc_api.get_conference(conference_id, only_if_changed=True)
+    if new_conference is None:
+        logging.debug(f"Conference {conference_id} unchanged")
+        return False
+
+    new_events = sorted(new_conference.events, key=lambda event: event.date)
     if settings.limit_events is not None:
-        new_conference.events = new_conference.events[:settings.limit_events]
+        new_events = new_events[:settings.limit_events]
 
-    conference = new_conference
-    global events
-    events = conference.events
+    diff = diff_events(conference_events.get(conference_id, []), new_events)
+    conference_events[conference_id] = new_events
 
+    if diff.is_empty():
+        return False
 
-    global persistent_data
+    logging.info(
+        f"Conference {conference_id} changed: {len(diff.added)} added, "
+        f"{len(diff.removed)} removed, {len(diff.changed)} changed"
+    )
 
-    for event in events:
-        guid = event.guid
-        if guid not in persistent_data.event_states:
-            logging.info(f"Adding event {guid}")
-            persistent_data.event_states[guid] = EventState()
-            persistent_data.event_states[guid].add_log("Event added")
+    # the listing changes e.g. when a recording was published, so the details are stale
+    for event in diff.changed:
+        voc_api.invalidate_event(conference_id, event.guid)
+        if pipeline_running:
+            submission_priority.forget(event.guid)
+            # e.g. a new title or video file name, retry without waiting for the backoff
+            event_state = persistent_data.event_states.get(event.guid)
+            if event_state is not None and event_state.next_attempt_at is not None:
+                event_state.next_attempt_at = None
+
+    for guid in diff.removed:
+        voc_api.invalidate_event(conference_id, guid)
+        if pipeline_running:
+            submission_priority.forget(guid)
+        event_state = persistent_data.event_states.get(guid)
+        if event_state is not None and pipeline_running:
+            event_state.add_log("Event removed from conference")
 
+    return True
+
+
+def add_missing_event_states():
+    for conference_id, conference_event_list in conference_events.items():
+        for event in conference_event_list:
+            event_state = persistent_data.event_states.get(event.guid)
+            if event_state is None:
+                logging.info(f"Adding event {event.guid} of {conference_id}")
+                persistent_data.add_event_state(event.guid, conference_id).add_log("Event added")
+            elif event_state.conference is None:
+                # stored before there were several conferences
+                event_state.conference = conference_id
 
-async def download_file(url, file: IO[bytes]):
-    async with httpx.AsyncClient(timeout=10.0).stream('GET', url, follow_redirects=True) as res:
+
+@asynccontextmanager
+async def open_recording(url: str):
+    async with http_client.stream("GET", url, follow_redirects=True) as res:
         res.raise_for_status()
-        async for chunk in res.aiter_bytes():
-            file.write(chunk)
+        yield res
+
+
+def query_events(
+    sort: SortKey,
+    descending: bool,
+    conference: str | None,
+    state: State | None,
+    failed: bool | None,
+    cursor: str | None,
+    limit: int,
+) -> EventPage:
+    try:
+        return event_index.query(
+            events,
+            persistent_data,
+            sort=sort,
+            descending=descending,
+            conference=conference,
+            state=state,
+            failed=failed,
+            cursor=cursor,
+            limit=min(max(limit, 1), 500),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @app.get("/", response_class=HTMLResponse)
-async def home(request: Request):
+async def home(
+    request: Request,
+    sort: SortKey = "date",
+    descending: bool = False,
+    conference: str | None = None,
+    state: State | None = None,
+    failed: bool | None = None,
+    cursor: str | None = None,
+    limit: int = 100,
+):
+    page = query_events(sort, descending, conference, state, failed, cursor, limit)
+    filters = {
+        key: value
+        for key, value in {
+            "sort": sort,
+            "descending": descending or None,
+            "conference": conference,
+            "state": state.value if state is not None else None,
+            "failed": failed,
+            "limit": limit,
+        }.items()
+        if value is not None
+    }
     return templates.TemplateResponse(
-        "home.html", {"request": request, "events": events, "state": persistent_data.event_states}
+        "home.html",
+        {
+            "request": request,
+            "page": page,
+            "total_events": len(events),
+            "filters": filters,
+            "states": list(State),
+            "breakers": breakers(),
+        },
+    )
+
+
+@app.get("/api/events")
+async def api_events(
+    sort: SortKey = "date",
+    descending: bool = False,
+    conference: str | None = None,
+    state: State | None = None,
+    failed: bool | None = None,
+    cursor: str | None = None,
+    limit: int = 100,
+):
+    page = query_events(sort, descending, conference, state, failed, cursor, limit)
+    return {
+        "events": [
+            {
+                "guid": row.guid,
+                "conference": row.conference,
+                "title": row.title,
+                "date": row.date,
+                "state": row.state.value,
+                "failed": row.failed,
+            }
+            for row in page.rows
+        ],
+        "total": page.total,
+        "counts": page.counts,
+        "conferences": page.conferences,
+        "next_cursor": page.next_cursor,
+    }
+
+
+@app.get("/api/http_pool")
+async def http_pool():
+    return pool_stats(http_client)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    # the counters are per process, only the pipeline's are meaningful
+    if not pipeline_running:
+        raise HTTPException(status_code=503, detail="Metrics are served by the worker running the pipeline")
+    metrics.observe_events(persistent_data.event_states.values())
+    metrics.observe_cache("voc_events", voc_api.event_cache)
+    metrics.observe_cache("exports", export_cache)
+    metrics.observe_gauges(pool_stats(http_client), metrics.HTTP_POOL)
+    metrics.observe_breakers(breakers())
+    for stage, stats in scheduler.stats().items():
+        metrics.observe_gauges(stats, metrics.STAGE_TASKS, stage)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/api/stream")
+async def stream(event: str | None = None):
+    return StreamingResponse(
+        live_updates.stream(event),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @app.get("/events/{id}", response_class=HTMLResponse)
 async def event(request: Request, id: str):
-    event = await voc_api.get_event(settings.conference, id)
+    state = persistent_data.event_states.get(id)
+    conference_id = conference_of(state) if state is not None else settings.default_conference
+    event = await voc_api.get_event(conference_id, id)
 
     transcribee_url = None
-    state = persistent_data.event_states.get(id)
 
     if state and state.transcribee_share_token:
         encoded_token = urllib.parse.quote_plus(state.transcribee_share_token)
@@ -286,39 +1002,71 @@ async def event(request: Request, id: str):
     )
 
 
+@app.get("/events/{id}/log")
+async def event_log(id: str, offset: int = 0, limit: int = 50):
+    state = persistent_data.event_states.get(id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown event")
+
+    # newest first
+    entries = state.log[::-1][offset : offset + limit]
+    return {"total": len(state.log), "entries": entries}
+
+
+def get_event_state(id: str) -> EventState:
+    state = persistent_data.event_states.get(id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown event")
+    return state
+
+
 @app.post("/events/{id}/finish_transcript", response_class=HTMLResponse)
 async def finish_transcript(request: Request, id: str):
-    if id not in persistent_data.event_states:
-        persistent_data.event_states[id] = EventState()
-
-    persistent_data.event_states[id].transcription_finished = True
+    dispatch("finish_transcript", id)
 
     return RedirectResponse(f"/events/{id}", status_code=303)
 
 
 @app.post("/events/{id}/mark_corrected", response_class=HTMLResponse)
 async def finish_subtitles(request: Request, id: str):
-    persistent_data.event_states[id].switch_state(State.DONE)
+    get_event_state(id)
+    dispatch("mark_corrected", id)
 
     return RedirectResponse(f"/events/{id}", status_code=303)
 
 
 @app.post("/events/{id}/upload_to_voc", response_class=HTMLResponse)
 async def upload_to_voc(request: Request, id: str):
-    transcribee_doc = persistent_data.event_states[id].transcribee_doc
-    if transcribee_doc is None:
+    if get_event_state(id).transcribee_doc is None:
         raise HTTPException(status_code=400, detail="No transcribee document created yet")
 
-    await export_transcribee_document_to_voc(id, transcribee_doc)
+    # runs in the republish stage, the log shows when it is done
+    dispatch("upload_to_voc", id)
+
+    return RedirectResponse(f"/events/{id}", status_code=303)
+
+
+@app.post("/republish_changed", response_class=HTMLResponse)
+async def republish_changed(request: Request):
+    dispatch("republish_changed")
+
+    return RedirectResponse("/", status_code=303)
+
+
+@app.post("/events/{id}/bump", response_class=HTMLResponse)
+async def bump(request: Request, id: str):
+    if get_event_state(id).state != State.NEW:
+        raise HTTPException(status_code=400, detail="Event was already submitted")
+
+    dispatch("bump", id)
 
     return RedirectResponse(f"/events/{id}", status_code=303)
 
 
 @app.post("/events/{id}/reset_failed", response_class=HTMLResponse)
 async def reset_failed(request: Request, id: str):
-    persistent_data.event_states[id].failed = False
-    persistent_data.event_states[id].try_count = 0
-    persistent_data.event_states[id].add_log("Reset failed state")
+    get_event_state(id)
+    dispatch("reset_failed", id)
 
     return RedirectResponse(f"/events/{id}", status_code=303)
 
@@ -330,17 +1078,61 @@ async def vtt(request: Request, id: str):
     if state is None or state.transcribee_doc is None:
         raise HTTPException(status_code=404, detail="No transcribee document created yet")
 
-    vtt = await transcribee_api.export(state.transcribee_doc, format="VTT", include_word_timing=True)
-    return format_subtitle_vtt(vtt)
+    exported = await get_export(state.transcribee_doc)
+    return exported.formatted_vtt
 
 
-async def export_transcribee_document_to_voc(event_id: str, transcribee_doc: str):
-    event = await voc_api.get_event(settings.conference, event_id)
+async def get_export(transcribee_doc: str, max_age: float | None = None) -> CachedExport:
+    """
+    The cache is keyed by the changed_at of a document listing that is at most
+    `max_age` (default `document_index_max_age`) old, a correction made since
+    then is missing from the cached export.
+    """
+    if max_age is None:
+        max_age = settings.document_index_max_age
+    document = await document_index.get(transcribee_doc, max_age=max_age)
+
+    if document is not None:
+        cached = export_cache.get(transcribee_doc, document.changed_at)
+        if cached is not None:
+            return cached
+
     vtt = await transcribee_api.export(transcribee_doc, format="VTT", include_word_timing=True)
-    formatted_vtt = format_subtitle_vtt(vtt)
+    exported = CachedExport(
+        changed_at=document.changed_at if document is not None else "",
+        raw_vtt=vtt,
+        formatted_vtt=format_subtitle_vtt(vtt),
+    )
+    # without a changed_at we can't tell when the entry gets stale
+    if document is not None:
+        export_cache.put(transcribee_doc, document.changed_at, exported.raw_vtt, exported.formatted_vtt)
+    return exported
+
+
+async def export_transcribee_document_to_voc(event_id: str, transcribee_doc: str):
+    event_state = persistent_data.event_states[event_id]
+    event = await voc_api.get_event(conference_of(event_state), event_id)
+    # a manual upload follows a correction, so it needs a listing from after the
+    # click. All uploads of a republish batch share that one listing.
+    max_age = settings.document_index_max_age
+    if uploads_requested_at is not None:
+        max_age = min(max_age, time.monotonic() - uploads_requested_at)
+    exported = await get_export(transcribee_doc, max_age=max_age)
+
+    vtt_hash = hashlib.sha256(exported.formatted_vtt.encode()).hexdigest()
+    if (
+        event_state.published_vtt_hash == vtt_hash
+        and event_state.published_vtt_language == event.original_language
+    ):
+        event_state.add_log("Subtitles unchanged since the last upload, not uploading")
+        return
+
     await voc_api.upload_vtt(
-        conference=settings.conference,
+        conference=conference_of(event_state),
         event=event_id,
-        vtt=formatted_vtt,
+        vtt=exported.formatted_vtt,
         language=event.original_language,
     )
+    event_state.published_vtt_hash = vtt_hash
+    event_state.published_vtt_language = event.original_language
+    event_state.add_log("Uploaded subtitles to voc")
@@ -0,0 +1,135 @@
+"""
+Prometheus metrics of the glue service, exported on `/metrics`.
+"""
+
+import time
+from typing import AsyncIterable, AsyncIterator, Iterable
+import urllib.parse
+
+import httpx
+from prometheus_client import Counter, Gauge, Histogram
+
+from transcribee_voctoweb.helpers.circuit_breaker import BreakerState, CircuitBreaker
+from transcribee_voctoweb.persistent_data import EventState, State
+
+EVENTS = Gauge("glue_events", "Events per state, including failed ones", ["state"])
+EVENTS_FAILED = Gauge("glue_events_failed", "Events that failed and wait for a manual reset")
+
+TICK_DURATION = Histogram(
+    "glue_tick_duration_seconds",
+    "Duration of one run of a periodic task",
+    ["task"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120),
+)
+TICK_OVERRUNS = Counter(
+    "glue_tick_overruns_total", "Runs of a periodic task that took longer than its interval", ["task"]
+)
+
+SAVE_DURATION = Histogram(
+    "glue_save_duration_seconds",
+    "Duration of writing the changed event states",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+SAVE_BYTES = Counter("glue_save_bytes_total", "Bytes of event state written to the storage")
+
+HTTP_DURATION = Histogram(
+    "glue_http_request_duration_seconds",
+    "Time until the response headers of an upstream request arrived",
+    ["upstream", "method"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 120),
+)
+HTTP_ERRORS = Counter(
+    "glue_http_errors_total",
+    "Upstream requests that failed or returned an error status",
+    ["upstream", "reason"],
+)
+
+TRANSFER_BYTES = Counter(
+    "glue_transfer_bytes_total", "Bytes of recordings downloaded from voctoweb and uploaded to transcribee",
+    ["direction"],
+)
+
+CACHE_HITS = Gauge("glue_cache_hits", "Cache hits since the start", ["cache"])
+CACHE_MISSES = Gauge("glue_cache_misses", "Cache misses since the start", ["cache"])
+HTTP_POOL = Gauge("glue_http_pool", "Connections and requests of the shared http pool", ["kind"])
+BREAKER_STATE = Gauge(
+    "glue_circuit_breaker_state", "Circuit breaker per upstream: 0 closed, 1 half open, 2 open", ["upstream"]
+)
+SUBMISSIONS_HELD = Gauge("glue_submissions_held", "1 while submissions wait for transcribee to catch up")
+STAGE_TASKS = Gauge("glue_scheduler_tasks", "Events queued and running per scheduler stage", ["stage", "kind"])
+
+
+def observe_tick(task: str, duration: float, interval: float):
+    TICK_DURATION.labels(task).observe(duration)
+    if duration > interval:
+        TICK_OVERRUNS.labels(task).inc()
+
+
+def observe_events(event_states: Iterable[EventState]):
+    counts = {state: 0 for state in State}
+    failed = 0
+    for event_state in event_states:
+        counts[event_state.state] += 1
+        failed += event_state.failed
+
+    for state, count in counts.items():
+        EVENTS.labels(state.value).set(count)
+    EVENTS_FAILED.set(failed)
+
+
+def observe_cache(name: str, cache):
+    CACHE_HITS.labels(name).set(cache.hits)
+    CACHE_MISSES.labels(name).set(cache.misses)
+
+
+def observe_breakers(breakers: Iterable[CircuitBreaker]):
+    values = {BreakerState.CLOSED: 0, BreakerState.HALF_OPEN: 1, BreakerState.OPEN: 2}
+    for breaker in breakers:
+        BREAKER_STATE.labels(breaker.upstream).set(values[breaker.state])
+
+
+def observe_gauges(values: dict[str, int], gauge: Gauge, *labels: str):
+    for kind, value in values.items():
+        gauge.labels(*labels, kind).set(value)
+
+
+async def count_transfer(source: AsyncIterable[bytes], direction: str) -> AsyncIterator[bytes]:
+    counter = TRANSFER_BYTES.labels(direction)
+    async for chunk in source:
+        counter.inc(len(chunk))
+        yield chunk
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Records latency and errors of every request per upstream. Requests to hosts
+    that are not in `upstreams` are counted as recording downloads.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, upstreams: dict[str, str]):
+        self.transport = transport
+        self.upstreams = upstreams
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        upstream = self.upstreams.get(request.url.host, "recordings")
+        start = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            HTTP_ERRORS.labels(upstream, "timeout").inc()
+            raise
+        except httpx.TransportError:
+            HTTP_ERRORS.labels(upstream, "transport").inc()
+            raise
+
+        HTTP_DURATION.labels(upstream, request.method).observe(time.perf_counter() - start)
+        if response.status_code >= 400:
+            HTTP_ERRORS.labels(upstream, str(response.status_code)).inc()
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def upstream_hosts(urls: dict[str, str]) -> dict[str, str]:
+    return {urllib.parse.urlsplit(url).hostname or "": name for name, url in urls.items()}
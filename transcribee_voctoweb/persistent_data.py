@@ -1,10 +1,14 @@
 from enum import Enum
+import functools
 import json
+import logging
 from pathlib import Path
-from typing import Union
 from datetime import datetime
+from typing import Any, Callable
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
+
+from transcribee_voctoweb.storage import StorageBackend
 
 class State(Enum):
     NEW = "new"
@@ -13,31 +17,128 @@ class State(Enum):
     CORRECTING = "correcting"
     DONE  = "done"
 
+# states in which the subtitles can be (re)published to voctoweb
+REPUBLISHABLE_STATES = {State.NEEDS_CORRECTION, State.CORRECTING, State.DONE}
+
+# older log entries are dropped
+MAX_LOG_ENTRIES = 100
+
 class LogEntry(BaseModel):
     ts: datetime
     msg: str
+    # a message repeated right after itself is only stored once
+    count: int = 1
+    last_ts: datetime | None = None
+
+EventLog = TypeAdapter(list[LogEntry])
+
+def coalesce_log(log: list[LogEntry]) -> list[LogEntry]:
+    coalesced: list[LogEntry] = []
+    for entry in log:
+        last = coalesced[-1] if coalesced else None
+        if last is not None and last.msg == entry.msg:
+            last.count += entry.count
+            last.last_ts = entry.last_ts or entry.ts
+        else:
+            coalesced.append(entry.model_copy())
+    return coalesced[-MAX_LOG_ENTRIES:]
 
 class EventState(BaseModel):
+    # acronym of the voctoweb conference, None for events stored before there were several
+    conference: str | None = None
     state: State = State.NEW
     failed: bool = False
     transcribee_doc: str | None = None
     transcribee_share_token: str | None = None
     transcription_finished: bool = False
     subtitles_finished: bool = False
-    log: list[LogEntry] = []
+    # stored separately, see `PersistentData.save`
+    log: list[LogEntry] = Field(default=[], exclude=True)
     try_count: int = 0
+    # unix time before which the event is not processed again after an error
+    next_attempt_at: float | None = None
+    backoff_exponent: int = 0
+    # submitted to transcribee before all other new events, set by operators
+    bumped: bool = False
+    # sha256 and language of the last vtt uploaded to voctoweb
+    published_vtt_hash: str | None = None
+    published_vtt_language: str | None = None
+
+    _on_change: Callable[[], None] | None = None
+    _on_log_change: Callable[[], None] | None = None
+
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        if name == "log":
+            self._mark_log_changed()
+        elif name in type(self).model_fields:
+            self._mark_changed()
+
+    def _mark_changed(self):
+        if self._on_change is not None:
+            self._on_change()
+
+    def _mark_log_changed(self):
+        if self._on_log_change is not None:
+            self._on_log_change()
 
     def switch_state(self, new_state: State):
         self.add_log(f"Switching from {self.state} to {new_state}")
         self.state = new_state
 
     def add_log(self, message: str):
-        self.log.append(LogEntry(ts=datetime.now(), msg=message))
+        now = datetime.now()
+        last = self.log[-1] if self.log else None
+        if last is not None and last.msg == message:
+            last.count += 1
+            last.last_ts = now
+        else:
+            self.log.append(LogEntry(ts=now, msg=message))
+            del self.log[:-MAX_LOG_ENTRIES]
+        self._mark_log_changed()
 
 
 class PersistentData(BaseModel):
     event_states: dict[str, EventState] = {}
-    _last_saved: Union["PersistentData", None] = None
+    _dirty: set[str] = set()
+    _dirty_logs: set[str] = set()
+    # position in the storage's change sequence that is reflected in memory
+    _last_change: int = 0
+    # called with the guid, the event state and "state" or "log" on every change
+    _listeners: list[Callable[[str, EventState, str], None]] = []
+
+    def model_post_init(self, __context: Any):
+        for guid, event_state in self.event_states.items():
+            self._track(guid, event_state)
+
+    def _track(self, guid: str, event_state: EventState):
+        event_state._on_change = functools.partial(self._mark_dirty, guid)
+        event_state._on_log_change = functools.partial(self._mark_log_dirty, guid)
+
+    def add_listener(self, listener: Callable[[str, EventState, str], None]):
+        self._listeners.append(listener)
+
+    def _notify(self, guid: str, kind: str):
+        event_state = self.event_states.get(guid)
+        if event_state is None:
+            return
+        for listener in self._listeners:
+            listener(guid, event_state, kind)
+
+    def _mark_dirty(self, guid: str):
+        self._dirty.add(guid)
+        self._notify(guid, "state")
+
+    def _mark_log_dirty(self, guid: str):
+        self._dirty_logs.add(guid)
+        self._notify(guid, "log")
+
+    def add_event_state(self, guid: str, conference: str | None = None) -> EventState:
+        event_state = EventState(conference=conference)
+        self._track(guid, event_state)
+        self.event_states[guid] = event_state
+        self._mark_dirty(guid)
+        return event_state
 
     @staticmethod
     def load_json(state_path: Path):
@@ -47,18 +148,92 @@ class PersistentData(BaseModel):
         with open(state_path, "r") as file:
             loaded = json.load(file)
 
-        return PersistentData(**loaded)
+        data = PersistentData(**loaded)
+        for event_state in data.event_states.values():
+            event_state.log = coalesce_log(event_state.log)
+        return data
 
-    def save_json(self, state_path: Path, only_if_changed=False):
-        if (
-            only_if_changed
-            and self._last_saved
-            and self._last_saved.model_dump() == self.model_dump()
-        ):
-            return
+    @staticmethod
+    def load(storage: StorageBackend, import_path: Path | None = None):
+        # before loading, changes made in between are picked up by `refresh`
+        last_change = storage.last_change()
+        records = storage.load_records()
+
+        if not records and import_path is not None and import_path.exists():
+            logging.info(f"Importing existing state from {import_path}")
+            data = PersistentData.load_json(import_path)
+            data._dirty = set(data.event_states.keys())
+            data._dirty_logs = set(data.event_states.keys())
+            data.save(storage)
+            return data
+
+        logs = storage.load_logs()
+        event_states = {}
+        migrated = set()
+        for guid, record in records.items():
+            event_state = EventState.model_validate_json(record)
+            if guid in logs:
+                event_state.log = EventLog.validate_json(logs[guid])
+            elif event_state.log:
+                # the log used to be stored as part of the event state
+                event_state.log = coalesce_log(event_state.log)
+                migrated.add(guid)
+            event_states[guid] = event_state
+
+        data = PersistentData(event_states=event_states)
+        data._dirty = set(migrated)
+        data._dirty_logs = set(migrated)
+        data._last_change = last_change
+        return data
+
+    def refresh(self, storage: StorageBackend):
+        """
+        Loads the event states and logs another process saved since the last
+        refresh. Only for processes that don't save themselves.
+        """
+        records, logs, self._last_change = storage.load_changes(self._last_change)
+
+        for guid, record in records.items():
+            event_state = EventState.model_validate_json(record)
+            previous = self.event_states.get(guid)
+            if previous is not None:
+                event_state.log = previous.log
+            self._track(guid, event_state)
+            self.event_states[guid] = event_state
+            self._mark_dirty(guid)
+
+        for guid, log in logs.items():
+            event_state = self.event_states.get(guid)
+            if event_state is not None:
+                event_state.log = EventLog.validate_json(log)
+
+        # nothing changed locally
+        self._dirty.difference_update(records)
+        self._dirty_logs.difference_update(logs)
+
+    def save(self, storage: StorageBackend) -> int:
+        """
+        Writes the event states and logs that changed since the last save and
+        returns the number of bytes written.
+        """
+        if not self._dirty and not self._dirty_logs:
+            return 0
 
-        with open(state_path, "w") as file:
-            copy = self.model_copy(deep=True)
-            json_str = copy.model_dump_json(indent=2)
-            file.write(json_str)
-            self._last_saved = copy
+        # swap instead of clear, changes made during the save land in the new sets
+        dirty, self._dirty = self._dirty, set()
+        dirty_logs, self._dirty_logs = self._dirty_logs, set()
+        try:
+            records = {guid: self.event_states[guid].model_dump_json() for guid in dirty}
+            logs = {
+                guid: EventLog.dump_json(self.event_states[guid].log).decode() for guid in dirty_logs
+            }
+            if records:
+                storage.write_records(records)
+            if logs:
+                storage.write_logs(logs)
+        except BaseException:
+            # written again by the next save
+            self._dirty |= dirty
+            self._dirty_logs |= dirty_logs
+            raise
+        return sum(len(record) for record in [*records.values(), *logs.values()])
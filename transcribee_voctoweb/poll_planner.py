@@ -0,0 +1,51 @@
+import time
+
+from transcribee_voctoweb.transcribee_api.model import TaskQueueInfoResponse, TaskResponse
+
+
+def estimate_etas(
+    queue_info: TaskQueueInfoResponse, task_index: dict[str, list[TaskResponse]]
+) -> dict[str, float]:
+    """
+    Estimates for every document with open tasks how much work (in transcribee's
+    remaining_cost, roughly worker seconds) is queued until its last open task is done.
+    Assumes `open_tasks` are returned in queue order.
+    """
+    doc_for_task = {
+        str(task.id): doc_id for doc_id, tasks in task_index.items() for task in tasks
+    }
+
+    etas = {}
+    queued_cost = 0.0
+    for task in queue_info.open_tasks:
+        queued_cost += task.remaining_cost
+        doc_id = doc_for_task.get(str(task.id))
+        if doc_id is not None:
+            etas[doc_id] = queued_cost
+    return etas
+
+
+class PollPlanner:
+    """
+    Decides when a document should be polled next: rarely while its tasks are deep
+    in the transcribee queue, often when they are close to completion.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, eta_factor: float):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.eta_factor = eta_factor
+        self._next_poll: dict[str, float] = {}
+
+    def is_due(self, doc_id: str) -> bool:
+        return self._next_poll.get(doc_id, 0.0) <= time.monotonic()
+
+    def plan(self, doc_id: str, eta: float | None):
+        if eta is None:
+            interval = self.min_interval
+        else:
+            interval = min(max(eta * self.eta_factor, self.min_interval), self.max_interval)
+        self._next_poll[doc_id] = time.monotonic() + interval
+
+    def forget(self, doc_id: str):
+        self._next_poll.pop(doc_id, None)
@@ -0,0 +1,138 @@
+import asyncio
+from collections import deque
+import logging
+from typing import Awaitable, Callable
+
+# A stage handler processes one key and can return the name of the stage the key
+# should be handed over to next.
+StageHandler = Callable[[str], Awaitable[str | None]]
+
+DEFAULT_FLOW = "default"
+
+
+class FairQueue:
+    """
+    Weighted fair queue over flows (e.g. conferences). Every key gets a virtual
+    finish time of `1 / weight` after the previous key of its flow (or after the
+    current virtual time, if the flow was idle), and keys are taken in order of
+    their finish time. So a flow with weight 2 gets twice the share of a flow with
+    weight 1 while both have keys queued, and a large backlog can't starve a small
+    flow. Every flow can hold up to `maxsize` keys.
+    """
+
+    def __init__(self, maxsize: int, weights: dict[str, float]):
+        self.maxsize = maxsize
+        self.weights = weights
+        self._flows: dict[str, deque[tuple[float, str]]] = {}
+        self._last_finish: dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._items = asyncio.Semaphore(0)
+
+    def qsize(self) -> int:
+        return sum(len(flow) for flow in self._flows.values())
+
+    def put_nowait(self, key: str, flow: str = DEFAULT_FLOW):
+        queue = self._flows.setdefault(flow, deque())
+        if len(queue) >= self.maxsize:
+            raise asyncio.QueueFull()
+
+        start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+        finish = start + 1 / self.weights.get(flow, 1.0)
+        self._last_finish[flow] = finish
+        queue.append((finish, key))
+        self._items.release()
+
+    async def get(self) -> tuple[str, str]:
+        await self._items.acquire()
+        flow, queue = min(
+            ((flow, queue) for flow, queue in self._flows.items() if queue),
+            key=lambda item: item[1][0][0],
+        )
+        finish, key = queue.popleft()
+        self._virtual_time = finish
+        return key, flow
+
+
+class Stage:
+    def __init__(
+        self, name: str, handler: StageHandler, concurrency: int, queue_depth: int, weights: dict[str, float]
+    ):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.queue = FairQueue(maxsize=queue_depth, weights=weights)
+        self.running = 0
+
+
+class Scheduler:
+    """
+    Runs keys (event guids) through named stages. Every stage has its own bounded
+    queue and a fixed number of workers, so a slow stage never blocks the others.
+    A key is only ever queued or running in one stage at a time. Keys belong to a
+    flow, which every stage serves fairly according to `weights`.
+    """
+
+    def __init__(self, weights: dict[str, float] | None = None):
+        self.stages: dict[str, Stage] = {}
+        self.weights = weights if weights is not None else {}
+        self._pending: dict[str, str] = {}
+        self._workers: list[asyncio.Task] = []
+
+    def add_stage(self, name: str, handler: StageHandler, concurrency: int, queue_depth: int):
+        self.stages[name] = Stage(name, handler, concurrency, queue_depth, self.weights)
+
+    def is_pending(self, key: str) -> bool:
+        return key in self._pending
+
+    def schedule(self, stage_name: str, key: str, flow: str = DEFAULT_FLOW) -> bool:
+        if key in self._pending:
+            return False
+
+        return self._enqueue(self.stages[stage_name], key, flow)
+
+    def _enqueue(self, stage: Stage, key: str, flow: str) -> bool:
+        try:
+            stage.queue.put_nowait(key, flow)
+        except asyncio.QueueFull:
+            logging.debug(f"Queue of stage {stage.name} is full for {flow}, not scheduling {key}")
+            return False
+
+        self._pending[key] = stage.name
+        return True
+
+    def start(self):
+        for stage in self.stages.values():
+            for _ in range(stage.concurrency):
+                self._workers.append(asyncio.create_task(self._work(stage)))
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _work(self, stage: Stage):
+        while True:
+            key, flow = await stage.queue.get()
+            stage.running += 1
+            next_stage = None
+            try:
+                next_stage = await stage.handler(key)
+            except Exception as exc:
+                logging.error(f"Stage {stage.name} failed for {key}", exc_info=exc)
+            finally:
+                stage.running -= 1
+                del self._pending[key]
+
+            if next_stage is not None:
+                self.schedule(next_stage, key, flow)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            name: {
+                "queued": stage.queue.qsize(),
+                "running": stage.running,
+                "concurrency": stage.concurrency,
+            }
+            for name, stage in self.stages.items()
+        }
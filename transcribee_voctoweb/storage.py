@@ -0,0 +1,203 @@
+from abc import ABC, abstractmethod
+import json
+import os
+from pathlib import Path
+import sqlite3
+import threading
+
+
+class StorageBackend(ABC):
+    """
+    Stores one serialized `EventState` (as a json string) per event guid, and
+    separately from that the serialized log of every event.
+    Backends only ever get handed the records that changed since the last save.
+    """
+
+    # whether several processes can use the storage at once, see `load_changes`
+    shareable = False
+
+    @abstractmethod
+    def load_records(self) -> dict[str, str]:
+        ...
+
+    @abstractmethod
+    def write_records(self, records: dict[str, str]):
+        ...
+
+    @abstractmethod
+    def load_logs(self) -> dict[str, str]:
+        ...
+
+    @abstractmethod
+    def write_logs(self, logs: dict[str, str]):
+        ...
+
+    def last_change(self) -> int:
+        """
+        Position in the change sequence, see `load_changes`
+        """
+        return 0
+
+    def load_changes(self, since: int) -> tuple[dict[str, str], dict[str, str], int]:
+        """
+        Records and logs written (possibly by another process) after `since`, and the
+        new position in the change sequence. Only for `shareable` backends.
+        """
+        raise NotImplementedError(f"{type(self).__name__} can't be shared between processes")
+
+    def close(self):
+        pass
+
+
+class JsonFileStorage(StorageBackend):
+    """
+    The original `data.json` format. Every save rewrites the whole file, so this
+    is only meant for small deployments and debugging.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._records: dict[str, str] = {}
+        self._logs: dict[str, str] = {}
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        with open(self.path, "r") as file:
+            loaded = json.load(file)
+
+        self._records = {
+            guid: json.dumps(event_state)
+            for guid, event_state in loaded.get("event_states", {}).items()
+        }
+        self._logs = {guid: json.dumps(log) for guid, log in loaded.get("event_logs", {}).items()}
+
+    def load_records(self) -> dict[str, str]:
+        self._load()
+        return dict(self._records)
+
+    def load_logs(self) -> dict[str, str]:
+        self._load()
+        return dict(self._logs)
+
+    def write_records(self, records: dict[str, str]):
+        self._records.update(records)
+        self._write()
+
+    def write_logs(self, logs: dict[str, str]):
+        self._logs.update(logs)
+        self._write()
+
+    def _write_section(self, file, records: dict[str, str]):
+        for i, (guid, record) in enumerate(records.items()):
+            if i > 0:
+                file.write(",")
+            file.write(f"\n{json.dumps(guid)}: {record}")
+
+    def _write(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as file:
+            file.write('{"event_states": {')
+            self._write_section(file, self._records)
+            file.write('\n}, "event_logs": {')
+            self._write_section(file, self._logs)
+            file.write("\n}}\n")
+        os.replace(tmp_path, self.path)
+
+
+TABLES = ("event_states", "event_logs")
+
+
+class SqliteStorage(StorageBackend):
+    """
+    One row per event in a sqlite database in WAL mode. A save only upserts the
+    rows of the events that changed. Every save stamps its rows with the next
+    number of a change sequence, so other processes can read only what changed.
+    """
+
+    shareable = True
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        # saves run in the threadpool, so the connection is shared between threads
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for table in TABLES:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(guid TEXT PRIMARY KEY, data TEXT NOT NULL, seq INTEGER NOT NULL DEFAULT 0)"
+            )
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if "seq" not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_seq ON {table} (seq)")
+        self._conn.commit()
+
+    def _load(self, table: str) -> dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT guid, data FROM {table}").fetchall()
+        return {guid: data for guid, data in rows}
+
+    def _write(self, table: str, records: dict[str, str]):
+        if not records:
+            return
+
+        with self._lock, self._conn:
+            seq = self._last_change() + 1
+            self._conn.executemany(
+                f"INSERT INTO {table} (guid, data, seq) VALUES (?, ?, ?) "
+                "ON CONFLICT(guid) DO UPDATE SET data = excluded.data, seq = excluded.seq",
+                ((guid, data, seq) for guid, data in records.items()),
+            )
+
+    def _last_change(self) -> int:
+        return max(
+            self._conn.execute(f"SELECT COALESCE(MAX(seq), 0) FROM {table}").fetchone()[0]
+            for table in TABLES
+        )
+
+    def load_records(self) -> dict[str, str]:
+        return self._load("event_states")
+
+    def write_records(self, records: dict[str, str]):
+        self._write("event_states", records)
+
+    def load_logs(self) -> dict[str, str]:
+        return self._load("event_logs")
+
+    def write_logs(self, logs: dict[str, str]):
+        self._write("event_logs", logs)
+
+    def last_change(self) -> int:
+        with self._lock:
+            return self._last_change()
+
+    def load_changes(self, since: int) -> tuple[dict[str, str], dict[str, str], int]:
+        # one read transaction, so both tables are from the same point in time
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            changes = [
+                self._conn.execute(
+                    f"SELECT guid, data, seq FROM {table} WHERE seq > ?", (since,)
+                ).fetchall()
+                for table in TABLES
+            ]
+        last = max((seq for rows in changes for _, _, seq in rows), default=since)
+        records, logs = ({guid: data for guid, data, _ in rows} for rows in changes)
+        return records, logs, last
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_storage(backend: str, data_path: Path, database_path: Path) -> StorageBackend:
+    if backend == "json":
+        return JsonFileStorage(data_path)
+    elif backend == "sqlite":
+        return SqliteStorage(database_path)
+    else:
+        raise ValueError(f"Unknown storage backend {backend}")
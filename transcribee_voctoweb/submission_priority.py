@@ -0,0 +1,119 @@
+from dataclasses import dataclass
+import datetime
+import heapq
+import math
+
+from transcribee_voctoweb.voc_api.model import DetailedEvent
+
+# a promoted talk outranks one with 100x the views
+PROMOTED_WEIGHT = 2.0
+# bonus of a talk released just now, halved after a day
+RECENCY_WEIGHT = 1.0
+# penalty per hour of recording, long talks keep the workers busy for longer
+DURATION_WEIGHT = 0.25
+
+
+@dataclass
+class PriorityInputs:
+    promoted: bool
+    view_count: int
+    release_date: datetime.datetime | None
+    duration: int
+
+    @classmethod
+    def from_details(cls, details: DetailedEvent) -> "PriorityInputs":
+        try:
+            release_date = datetime.datetime.fromisoformat(details.release_date)
+        except ValueError:
+            release_date = None
+        if release_date is not None and release_date.tzinfo is None:
+            release_date = release_date.replace(tzinfo=datetime.timezone.utc)
+
+        return cls(
+            promoted=details.promoted,
+            view_count=details.view_count,
+            release_date=release_date,
+            duration=details.duration,
+        )
+
+
+def score(inputs: PriorityInputs, now: datetime.datetime) -> float:
+    """
+    Higher scores are submitted first: promoted talks, then popular ones, with a
+    bonus for fresh releases and a penalty for long recordings.
+    """
+    recency = 0.0
+    if inputs.release_date is not None:
+        age_days = max((now - inputs.release_date).total_seconds() / 86400, 0.0)
+        recency = 1 / (1 + age_days)
+
+    return (
+        PROMOTED_WEIGHT * inputs.promoted
+        + math.log10(1 + inputs.view_count)
+        + RECENCY_WEIGHT * recency
+        - DURATION_WEIGHT * inputs.duration / 3600
+    )
+
+
+def interleave(ranked: dict[str, list[str]], weights: dict[str, float], limit: int) -> list[str]:
+    """
+    Takes up to `limit` keys from the ranked lists of several flows (e.g.
+    conferences), in weighted round-robin: a flow with weight 2 gets twice the
+    picks of a flow with weight 1 while both have keys left.
+    """
+    heap = [
+        (1 / weights.get(flow, 1.0), flow, 0)
+        for flow, keys in ranked.items()
+        if keys
+    ]
+    heapq.heapify(heap)
+
+    picked = []
+    while heap and len(picked) < limit:
+        finish, flow, i = heapq.heappop(heap)
+        picked.append(ranked[flow][i])
+        if i + 1 < len(ranked[flow]):
+            heapq.heappush(heap, (finish + 1 / weights.get(flow, 1.0), flow, i + 1))
+    return picked
+
+
+class SubmissionPriority:
+    """
+    Ranks new events for submission to transcribee. The inputs are taken from the
+    event details once and kept until the conference listing reports a change of
+    the event, so ranking does not cost a request per event and tick.
+    """
+
+    def __init__(self):
+        self._inputs: dict[str, PriorityInputs] = {}
+
+    def is_known(self, guid: str) -> bool:
+        return guid in self._inputs
+
+    def update(self, guid: str, details: DetailedEvent):
+        self._inputs[guid] = PriorityInputs.from_details(details)
+
+    def forget(self, guid: str):
+        self._inputs.pop(guid, None)
+
+    def score(self, guid: str, now: datetime.datetime | None = None) -> float | None:
+        inputs = self._inputs.get(guid)
+        if inputs is None:
+            return None
+        return score(inputs, now or datetime.datetime.now(datetime.timezone.utc))
+
+    def rank(self, guids: list[str], bumped: set[str]) -> list[str]:
+        """
+        Bumped events first, then by descending score. Events whose details could
+        not be fetched yet come last.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        scores = {guid: self.score(guid, now) for guid in guids}
+        return sorted(
+            guids,
+            key=lambda guid: (
+                guid not in bumped,
+                scores[guid] is None,
+                -(scores[guid] or 0.0),
+            ),
+        )
@@ -1,49 +1,225 @@
+import itertools
+import re
+from typing import Iterable, Iterator
 
-import io
-import webvtt
+
+class MalformedVttError(ValueError):
+    pass
+
+
+# same grammar as the webvtt-py parser we used before, so the output stays identical
+_TIMING_LINE_PATTERN = re.compile(r"\s*((?:\d+:)?\d{2}:\d{2}.\d{3})\s*-->\s*((?:\d+:)?\d{2}:\d{2}.\d{3})")
+_TIMESTAMP_PATTERN = re.compile(r"(\d+)?:?(\d{2}):(\d{2})[.,](\d{3})")
+_COMMENT_PATTERN = re.compile(r"NOTE(?:\s.+|$)")
+_STYLE_PATTERN = re.compile(r"STYLE[ \t]*$")
+_CUE_TAG_PATTERN = re.compile(r"<.*?>")
+# line boundaries of str.splitlines() other than "\n"
+_SPECIAL_LINE_BREAKS = re.compile("[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+MERGE_BELOW_LENGTH = 100
+MAX_LINE_LENGTH = 60
+
+
+class _Cue:
+    """
+    A cue that is being merged with its successors. The raw text is kept as a list
+    of parts and only joined once the cue is written.
+    """
+
+    __slots__ = ("start", "end", "parts", "text_length", "trailing_newline", "needs_normalizing", "open_tag")
+
+    def __init__(self, start: str, end: str, raw_text: str):
+        self.start = start
+        self.end = end
+        self.parts = [raw_text]
+        self.text_length = len(_clean(raw_text))
+        self.trailing_newline = raw_text.endswith("\n")
+        self.needs_normalizing = _SPECIAL_LINE_BREAKS.search(raw_text) is not None
+        self.open_tag = _has_open_tag(raw_text)
+
+    def merge(self, other: "_Cue"):
+        self.start = min(self.start, other.start)
+        self.end = max(self.end, other.end)
+
+        if (
+            self.needs_normalizing
+            or other.needs_normalizing
+            or self.trailing_newline
+            or other.trailing_newline
+            or self.open_tag
+        ):
+            # rare cases where concatenating changes the lines or cue tags, redo it all
+            raw_text = _normalize_lines("".join(self.parts) + other.parts[0])
+            self.parts = [raw_text]
+            self.text_length = len(_clean(raw_text))
+            self.trailing_newline = raw_text.endswith("\n")
+            self.needs_normalizing = False
+            self.open_tag = _has_open_tag(raw_text)
+        else:
+            self.parts.extend(other.parts)
+            self.text_length += other.text_length
+            self.open_tag = other.open_tag
 
 
 def format_subtitle_vtt(vtt: str) -> str:
-    captions: list[webvtt.Caption] = []
-    current_caption: webvtt.Caption | None = None
-    for caption in webvtt.read_buffer(io.StringIO(vtt)):
-        caption: webvtt.Caption
+    """
+    Merges consecutive cues while their combined text is shorter than 100 characters
+    and wraps the text of the merged cues at 60 characters.
+    """
+    return "\n".join(_format_lines(_split_lines(vtt)))
+
 
-        if current_caption is None:
-            current_caption = caption
+def _split_lines(vtt: str) -> Iterator[str]:
+    start = 0
+    length = len(vtt)
+    while start < length:
+        end = vtt.find("\n", start)
+        if end == -1:
+            end = length
+        yield vtt[start:end].rstrip("\n\r")
+        start = end + 1
+
+
+def _format_lines(lines: Iterable[str]) -> Iterator[str]:
+    yield "WEBVTT"
+
+    current: _Cue | None = None
+    for cue in _parse_cues(lines):
+        if current is None:
+            current = cue
             continue
 
-        if len(current_caption.text) + len(caption.text) < 100:
-            current_caption = _merge_captions(current_caption, caption)
+        if current.text_length + cue.text_length < MERGE_BELOW_LENGTH:
+            current.merge(cue)
         else:
-            line = ""
-            lines = []
-            for word in current_caption.text.split(" "):
-                if len(line) + len(word) > 60 and line != "":
-                    lines.append(line)
-                    line = word
-                else:
-                    line += " " + word
-
-            lines.append(line)
-
-            captions.append(webvtt.Caption(
-                start=current_caption.start,
-                end=current_caption.end,
-                text="\n".join(lines).strip(),
-            ))
-
-            current_caption = caption
-
-    output_stream = io.StringIO()
-    processed_vtt = webvtt.WebVTT(captions = captions)
-    processed_vtt.write(output_stream, format="vtt")
-
-    return output_stream.getvalue()
-
-def _merge_captions(cap1: webvtt.Caption, cap2: webvtt.Caption):
-    return webvtt.Caption(
-        start=min(cap1.start, cap2.start),
-        end=max(cap1.end, cap2.end),
-        text=cap1.raw_text + cap2.raw_text,
+            yield ""
+            yield f"{current.start} --> {current.end}"
+            yield from _wrap(_clean("".join(current.parts)))
+
+            current = cue
+
+    # the last cue is never written, this matches the previous implementation
+
+
+def _wrap(text: str) -> list[str]:
+    lines: list[str] = []
+    line: list[str] = []
+    line_length = 0
+    for word in text.split(" "):
+        if line_length + len(word) > MAX_LINE_LENGTH and line_length != 0:
+            lines.append("".join(line))
+            line = [word]
+            line_length = len(word)
+        else:
+            line.append(" ")
+            line.append(word)
+            line_length += 1 + len(word)
+
+    lines.append("".join(line))
+    return "\n".join(lines).strip().splitlines()
+
+
+def _parse_cues(lines: Iterable[str]) -> Iterator[_Cue]:
+    lines = iter(lines)
+    first_line = next(lines, None)
+    if first_line is None:
+        raise MalformedVttError("The file is empty.")
+    if not first_line.startswith("WEBVTT"):
+        raise MalformedVttError("The file does not have a valid format")
+
+    is_first_block = True
+    seen_cue = False
+    block: list[str] = []
+    for line in itertools.chain([first_line], lines):
+        if line:
+            # blocks never start with whitespace-only lines
+            if block or line.strip():
+                block.append(line)
+            continue
+
+        if block:
+            if not is_first_block:
+                for cue in _parse_block(block, seen_cue):
+                    seen_cue = True
+                    yield cue
+            is_first_block = False
+            block = []
+
+    if block and not is_first_block:
+        yield from _parse_block(block, seen_cue)
+
+
+def _parse_block(block: list[str], seen_cue: bool) -> Iterator[_Cue]:
+    if "-->" in block[0] or (len(block) > 1 and "-->" in block[1]):
+        yield from _parse_cue_block(block)
+    elif _COMMENT_PATTERN.match(block[0]):
+        return
+    elif _STYLE_PATTERN.match(block[0]):
+        if seen_cue:
+            raise MalformedVttError("Style block defined after the first cue")
+    elif len(block) == 1:
+        raise MalformedVttError("Standalone cue identifier")
+    else:
+        raise MalformedVttError("Missing timing cue")
+
+
+def _parse_cue_block(block: list[str]) -> Iterator[_Cue]:
+    timings = None
+    text_lines = []
+    for index, line in enumerate(block):
+        if "-->" in line:
+            if timings is not None:
+                # a second timing line starts a new cue
+                yield _make_cue(timings, text_lines)
+                yield from _parse_block(block[index:], True)
+                return
+
+            match = _TIMING_LINE_PATTERN.match(line)
+            if match is None:
+                raise MalformedVttError("Invalid time format")
+            timings = match.group(1), match.group(2)
+        elif index > 0:
+            # the first line is the cue identifier, which we drop
+            text_lines.append(line)
+
+    assert timings is not None
+    yield _make_cue(timings, text_lines)
+
+
+def _make_cue(timings: tuple[str, str], text_lines: list[str]) -> _Cue:
+    return _Cue(
+        _normalize_timestamp(timings[0]),
+        _normalize_timestamp(timings[1]),
+        "\n".join(text_lines),
     )
+
+
+def _normalize_timestamp(timestamp: str) -> str:
+    match = _TIMESTAMP_PATTERN.match(timestamp)
+    if match is None:
+        raise MalformedVttError(f"Invalid timestamp: {timestamp}")
+
+    hours, minutes, seconds, milliseconds = (int(value) if value else 0 for value in match.groups())
+    total_seconds = hours * 3600 + minutes * 60 + seconds + milliseconds / 1000
+
+    hours = int(total_seconds / 3600)
+    minutes = int(total_seconds / 60 - hours * 60)
+    seconds = total_seconds - hours * 3600 - minutes * 60
+    return "{:02d}:{:02d}:{:06.3f}".format(hours, minutes, seconds)
+
+
+def _has_open_tag(raw_text: str) -> bool:
+    """
+    Whether the last line has a "<" without a closing ">", i.e. whether appending
+    text could change which cue tags are found
+    """
+    last_line = raw_text.rpartition("\n")[2]
+    return last_line.rfind("<") > last_line.rfind(">")
+
+
+def _clean(raw_text: str) -> str:
+    return _CUE_TAG_PATTERN.sub("", raw_text)
+
+
+def _normalize_lines(text: str) -> str:
+    return "\n".join(text.splitlines())
@@ -1,19 +1,33 @@
+import io
+import secrets
 from tempfile import _TemporaryFileWrapper
-from typing import IO, Any, Literal
+from typing import IO, Any, AsyncIterable, Literal
 import httpx
 from pydantic.fields import Field
 from pydantic.type_adapter import TypeAdapter
+from transcribee_voctoweb.helpers.circuit_breaker import CircuitBreaker
+from transcribee_voctoweb.helpers.retry import raise_for_status
 from transcribee_voctoweb.transcribee_api.model import (
+    ApiDocumentWithTasks,
     BodyCreateDocumentApiV1DocumentsPost,
     CreateShareToken,
     Document,
     DocumentShareTokenBase,
+    TaskQueueInfoResponse,
     TaskResponse,
 )
 
 
 class DocumentBodyWithFile(BodyCreateDocumentApiV1DocumentsPost):
-    file: IO[bytes] | _TemporaryFileWrapper = Field(..., exclude=True)
+    file: IO[bytes] | _TemporaryFileWrapper | io.BufferedReader = Field(..., exclude=True)
+
+    model_config = {
+        'arbitrary_types_allowed': True
+    }
+
+class DocumentBodyWithStream(BodyCreateDocumentApiV1DocumentsPost):
+    file: AsyncIterable[bytes] = Field(..., exclude=True)
+    file_size: int = Field(..., exclude=True)
 
     model_config = {
         'arbitrary_types_allowed': True
@@ -24,10 +38,20 @@ file_entry_type = tuple[
 ]
 
 class TranscribeeApiClient:
-    def __init__(self, base_url: str, token: str):
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        api_token: str | None = None,
+        client: httpx.AsyncClient | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
         self.base_url = base_url
         self.token = token
-        self.client = httpx.AsyncClient(timeout=10.0)
+        # admin api token, only needed for the task queue info
+        self.api_token = api_token
+        self.client = client if client is not None else httpx.AsyncClient(timeout=10.0)
+        self.breaker = breaker if breaker is not None else CircuitBreaker("transcribee")
 
     def _get_headers(self):
         return {
@@ -37,22 +61,27 @@ class TranscribeeApiClient:
     def _get_url(self, url):
         return self.base_url + url
 
-    async def _get(self, url, params={}):
-        req = await self.client.get(
-            self._get_url(url), headers=self._get_headers(), params=params, timeout=120
-        )
-        req.raise_for_status()
+    async def _get(self, url, params={}, headers=None):
+        async with self.breaker:
+            req = await self.client.get(
+                self._get_url(url),
+                headers=self._get_headers() if headers is None else headers,
+                params=params,
+                timeout=120,
+            )
+            raise_for_status(req)
         return req
 
 
-    async def _post(self, url, **kwargs):
-        req = await self.client.post(
-            self._get_url(url),
-            **kwargs,
-            headers=self._get_headers(),
-        )
+    async def _post(self, url, headers={}, **kwargs):
+        async with self.breaker:
+            req = await self.client.post(
+                self._get_url(url),
+                **kwargs,
+                headers={**self._get_headers(), **headers},
+            )
 
-        req.raise_for_status()
+            raise_for_status(req)
         return req
 
     async def get_tasks_for_document(self, doc_id: str) -> list[TaskResponse]:
@@ -60,6 +89,18 @@ class TranscribeeApiClient:
         adapter = TypeAdapter(list[TaskResponse])
         return adapter.validate_json(req.text)
 
+    async def list_documents(self) -> list[ApiDocumentWithTasks]:
+        req = await self._get("/api/v1/documents/")
+        adapter = TypeAdapter(list[ApiDocumentWithTasks])
+        return adapter.validate_json(req.text)
+
+    async def get_queue_info(self) -> TaskQueueInfoResponse:
+        if self.api_token is None:
+            raise ValueError("Queue info needs an api token")
+
+        req = await self._get("/api/v1/tasks/queue_info/", headers={"Api-Token": self.api_token})
+        return TaskQueueInfoResponse.model_validate_json(req.text)
+
     async def create_document(self, document: DocumentBodyWithFile) -> Document:
         doc_dict = document.model_dump()
         data = {key: value for key, value in doc_dict.items() if key != "file" and value is not None}
@@ -71,6 +112,42 @@ class TranscribeeApiClient:
         req = await self._post("/api/v1/documents/", data=data, files=tuple(files))
         return Document.model_validate_json(req.text)
 
+    async def create_document_from_stream(self, document: DocumentBodyWithStream) -> Document:
+        """
+        Like `create_document`, but uploads the media file while it is still being
+        read from `document.file`. The multipart body is assembled by hand, as httpx
+        can only send multipart bodies from sync file objects.
+        """
+        doc_dict = document.model_dump()
+        data = {key: value for key, value in doc_dict.items() if value is not None}
+
+        boundary = secrets.token_hex(16)
+        head = b"".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode()
+            for key, value in data.items()
+        )
+        head += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="video.mp4"\r\n'
+            "Content-Type: video/mp4\r\n\r\n"
+        ).encode()
+        tail = f"\r\n--{boundary}--\r\n".encode()
+
+        async def body():
+            yield head
+            async for chunk in document.file:
+                yield chunk
+            yield tail
+
+        req = await self._post(
+            "/api/v1/documents/",
+            content=body(),
+            headers={
+                "Content-Type": f"multipart/form-data; boundary={boundary}",
+                "Content-Length": str(len(head) + document.file_size + len(tail)),
+            },
+        )
+        return Document.model_validate_json(req.text)
+
     async def create_share_token(self, doc_id: str, data: CreateShareToken):
         data_dict = data.model_dump()
         req = await self._post(f"/api/v1/documents/{doc_id}/share_tokens/", json=data_dict)
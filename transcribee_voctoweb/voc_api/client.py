@@ -1,12 +1,37 @@
+from dataclasses import dataclass
+import hashlib
 import json
 import httpx
+from transcribee_voctoweb.helpers.cache import TTLCache
+from transcribee_voctoweb.helpers.circuit_breaker import CircuitBreaker
+from transcribee_voctoweb.helpers.retry import raise_for_status
 from transcribee_voctoweb.voc_api.model import Conference, DetailedEvent
 
+@dataclass
+class _ResponseValidators:
+    etag: str | None
+    last_modified: str | None
+    content_hash: str
+
+
 class VocPublishingApiClient:
-    def __init__(self, base_url: str, token: str):
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        event_cache_size=2000,
+        event_cache_ttl=300.0,
+        client: httpx.AsyncClient | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
         self._base_url = base_url
-        self._client = httpx.AsyncClient(timeout=10.0)
+        self._client = client if client is not None else httpx.AsyncClient(timeout=10.0)
+        self.breaker = breaker if breaker is not None else CircuitBreaker("voctoweb")
         self._token = token
+        self._conference_validators: dict[str, _ResponseValidators] = {}
+        self.event_cache: TTLCache[tuple[str, str], DetailedEvent] = TTLCache(
+            maxsize=event_cache_size, ttl=event_cache_ttl
+        )
 
     def _get_headers(self):
         return {
@@ -17,43 +42,87 @@ class VocPublishingApiClient:
         return self._base_url + url
 
     async def _post(self, url, params={}, **kwargs):
-        req = await self._client.post(
-            self._get_url(url),
-            **kwargs,
-            headers=self._get_headers(),
-        )
-        req.raise_for_status()
+        async with self.breaker:
+            req = await self._client.post(
+                self._get_url(url),
+                **kwargs,
+                headers=self._get_headers(),
+            )
+            raise_for_status(req)
         return req
 
     async def _put(self, url, params={}, **kwargs):
-        req = await self._client.put(
-            self._get_url(url),
-            **kwargs,
-            headers=self._get_headers(),
-        )
-        req.raise_for_status()
+        async with self.breaker:
+            req = await self._client.put(
+                self._get_url(url),
+                **kwargs,
+                headers=self._get_headers(),
+            )
+            raise_for_status(req)
         return req
 
-    async def _get(self, url, params={}):
-        req = await self._client.get(
-            self._get_url(url), headers=self._get_headers(), params=params, timeout=120
-        )
-        req.raise_for_status()
+    async def _get(self, url, params={}, headers={}):
+        async with self.breaker:
+            req = await self._client.get(
+                self._get_url(url),
+                headers={**self._get_headers(), **headers},
+                params=params,
+                timeout=120,
+            )
+            # only returned for conditional requests
+            if req.status_code != httpx.codes.NOT_MODIFIED:
+                raise_for_status(req)
         return req
 
-    async def get_conference(self, conference: str) -> Conference:
+    async def get_conference(self, conference: str, only_if_changed=False) -> Conference | None:
+        """
+        With `only_if_changed`, returns None without parsing the response if the
+        conference did not change since the last call. Uses ETag / Last-Modified if
+        the server sends them and a hash of the response body otherwise.
+        """
+        previous = self._conference_validators.get(conference)
+
+        headers = {}
+        if only_if_changed and previous is not None:
+            if previous.etag is not None:
+                headers["If-None-Match"] = previous.etag
+            if previous.last_modified is not None:
+                headers["If-Modified-Since"] = previous.last_modified
+
         req = await self._get(
-            f"/{conference}"
+            f"/{conference}", headers=headers
         )
+        if req.status_code == 304:
+            return None
+
+        content_hash = hashlib.sha256(req.content).hexdigest()
+        if only_if_changed and previous is not None and previous.content_hash == content_hash:
+            return None
 
-        return Conference.model_validate_json(req.text)
+        parsed = Conference.model_validate_json(req.text)
+        # only after parsing, a response that failed to parse is requested again
+        self._conference_validators[conference] = _ResponseValidators(
+            etag=req.headers.get("etag"),
+            last_modified=req.headers.get("last-modified"),
+            content_hash=content_hash,
+        )
+        return parsed
 
     async def get_event(self, conference: str, event: str) -> DetailedEvent:
+        cached = self.event_cache.get((conference, event))
+        if cached is not None:
+            return cached
+
         req = await self._get(
             f"/{conference}/events/{event}"
         )
 
-        return DetailedEvent.model_validate_json(req.text)
+        details = DetailedEvent.model_validate_json(req.text)
+        self.event_cache.set((conference, event), details)
+        return details
+
+    def invalidate_event(self, conference: str, event: str):
+        self.event_cache.invalidate((conference, event))
 
     async def upload_file(self, conference: str, event: str, file_name: str, file_mime_type: str, file_content: httpx._types.FileContent, meta: dict):
         await self._put(
@@ -0,0 +1,99 @@
+"""
+Coordination between several uvicorn workers: one of them runs the pipeline, the
+others only serve the web interface from the shared sqlite database.
+"""
+
+from dataclasses import dataclass
+import fcntl
+import json
+import os
+from pathlib import Path
+import sqlite3
+import threading
+
+
+class PipelineLock:
+    """
+    An exclusive lock on a file, held for as long as the process lives. The
+    kernel releases it when the process dies, so another worker can take over.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd: int | None = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+@dataclass
+class Command:
+    action: str
+    event_id: str | None
+    # keyword arguments of the action
+    payload: dict | None = None
+
+
+class CommandQueue:
+    """
+    Manual actions from the web workers and the republish cli, waiting for the
+    pipeline process
+    """
+
+    def __init__(self, path: Path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS commands "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, action TEXT NOT NULL, event_id TEXT, payload TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(commands)")}
+        if "payload" not in columns:
+            self._conn.execute("ALTER TABLE commands ADD COLUMN payload TEXT")
+        self._conn.commit()
+
+    def push(self, action: str, event_id: str | None, payload: dict | None = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO commands (action, event_id, payload) VALUES (?, ?, ?)",
+                (action, event_id, json.dumps(payload) if payload is not None else None),
+            )
+
+    def pop_all(self) -> list[Command]:
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, action, event_id, payload FROM commands ORDER BY id"
+            ).fetchall()
+            if rows:
+                self._conn.execute("DELETE FROM commands WHERE id <= ?", (rows[-1][0],))
+        return [
+            Command(action, event_id, json.loads(payload) if payload is not None else None)
+            for _, action, event_id, payload in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()